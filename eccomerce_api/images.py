@@ -0,0 +1,93 @@
+import hashlib
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+FORMAT_EXTENSIONS = {
+    "webp": "webp",
+    "jpeg": "jpg",
+}
+
+
+def _render_variant(image, size, image_format):
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+    if image_format == "jpeg" and variant.mode != "RGB":
+        variant = variant.convert("RGB")
+
+    # Dropping info leaves EXIF, ICC and XMP metadata out of the new file
+    variant.info = {}
+
+    output = io.BytesIO()
+    quality = getattr(settings, "IMAGE_VARIANT_QUALITY", 80)
+    variant.save(output, format=image_format.upper(), quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def build_image_variants(field_file):
+    """
+    Renders the resized variants of an image field and saves them under
+    content hashed names next to the original.
+
+    Returns a dict with the name of the source file and the storage name of
+    every variant, keyed by "<size>_<format>".
+    """
+    storage = field_file.storage
+    directory = posixpath.join(posixpath.dirname(field_file.name), "variants")
+    sizes = getattr(settings, "IMAGE_VARIANT_SIZES", {"thumbnail": 200, "medium": 800})
+    formats = getattr(settings, "IMAGE_VARIANT_FORMATS", ("webp", "jpeg"))
+
+    with storage.open(field_file.name, "rb") as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    files = {}
+    for size_name, size in sizes.items():
+        for image_format in formats:
+            content = _render_variant(image, size, image_format)
+            digest = hashlib.sha256(content).hexdigest()[:32]
+            name = posixpath.join(directory, f"{digest}.{FORMAT_EXTENSIONS[image_format]}")
+
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(content))
+
+            files[f"{size_name}_{image_format}"] = name
+
+    return {"source": field_file.name, "files": files}
+
+
+def variant_urls(variants, storage, request=None):
+    """
+    Returns the URL of every variant, absolute when a request is given
+    """
+    urls = {}
+    for key, name in (variants or {}).get("files", {}).items():
+        url = storage.url(name)
+        urls[key] = request.build_absolute_uri(url) if request is not None else url
+
+    return urls
+
+
+def schedule_image_variants(instance, field_name, variants_field, task):
+    """
+    Queues task after commit when the image of instance has no variants yet.
+
+    Called from post_save, it clears stale variants when the image is removed.
+    """
+    field_file = getattr(instance, field_name)
+    variants = getattr(instance, variants_field) or {}
+
+    if not field_file:
+        if variants:
+            type(instance).objects.filter(pk=instance.pk).update(**{variants_field: {}})
+            setattr(instance, variants_field, {})
+        return
+
+    if variants.get("source") != field_file.name:
+        transaction.on_commit(lambda: task.delay(instance.pk))
@@ -0,0 +1,90 @@
+from django.conf import settings
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the newest-first ordering used by list endpoints.
+
+    `id` breaks ties between rows sharing the same `created_at`, so the
+    ordering is total and every page is a single indexed range scan no
+    matter how deep the client goes.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = getattr(settings, "PAGINATION_PAGE_SIZE", 20)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "PAGINATION_MAX_PAGE_SIZE", 100)
+
+
+class RankedPagination(BasePagination):
+    """
+    Page number pagination for ranked results such as search hits.
+
+    Ranked results have no stable key to build a cursor on. One extra row is
+    fetched to know whether a next page exists, so matches are never counted.
+    """
+
+    page_query_param = "page"
+    page_size_query_param = "page_size"
+    page_size = getattr(settings, "PAGINATION_PAGE_SIZE", 20)
+    max_page_size = getattr(settings, "PAGINATION_MAX_PAGE_SIZE", 100)
+
+    def _positive_int(self, value, default, cutoff=None):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return default
+
+        if value < 1:
+            return default
+
+        return min(value, cutoff) if cutoff else value
+
+    def paginate_results(self, fetch, request):
+        """
+        Calls fetch(limit, offset) for the requested page and returns its rows
+        """
+        self.request = request
+        self.page_number = self._positive_int(
+            request.query_params.get(self.page_query_param), 1
+        )
+        self.page_size = self._positive_int(
+            request.query_params.get(self.page_size_query_param),
+            self.page_size,
+            self.max_page_size,
+        )
+
+        offset = (self.page_number - 1) * self.page_size
+        results = list(fetch(self.page_size + 1, offset))
+        self.has_next = len(results) > self.page_size
+
+        return results[: self.page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
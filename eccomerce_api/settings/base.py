@@ -46,9 +46,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
-    "django.middleware.cache.UpdateCacheMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.cache.FetchFromCacheMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
@@ -133,17 +131,28 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Authentication
 AUTHENTICATION_BACKENDS = [
-    "users.backends.phone_backend.PhoneNumberAuthBackend",
-    "users.backends.email_backend.EmailAuthBackend",
+    "users.backends.credentials_backend.CredentialsAuthBackend",
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "dj_rest_auth.jwt_auth.JWTCookieAuthentication",
+        "users.authentication.CachedJWTCookieAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Seconds an authenticated user is served from the cache, saving or
+# deleting the user drops it earlier
+USER_AUTH_CACHE_TIMEOUT = 60
+
+# Seconds the /api/user/ payload is cached, changes to the user, profile,
+# addresses or phone number drop it earlier
+USER_DETAIL_CACHE_TIMEOUT = 60 * 60
+
+# Pagination
+PAGINATION_PAGE_SIZE = 20
+PAGINATION_MAX_PAGE_SIZE = 100
+
 
 # DRF Spectacular
 SPECTACULAR_SETTINGS = {
@@ -167,6 +176,9 @@ TOKEN_LENGTH = 6
 # Token expiry
 TOKEN_EXPIRE_MINUTES = 3
 
+# Wrong codes accepted before a sent OTP is discarded
+OTP_MAX_ATTEMPTS = 5
+
 
 # ACCOUNT_EMAIL_VERIFICATION SETTINGS
 ACCOUNT_EMAIL_REQUIRED = True
@@ -189,6 +201,13 @@ TWILIO_ACCOUNT_SID = config("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = config("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = config("TWILIO_PHONE_NUMBER")
 
+# Verification SMS are sent from Celery through this provider, at most
+# SMS_RATE_LIMIT per phone number every SMS_RATE_LIMIT_PERIOD seconds.
+# users.sms.LocMemSMSProvider keeps them in memory for offline load tests.
+SMS_PROVIDER = "users.sms.TwilioSMSProvider"
+SMS_RATE_LIMIT = 3
+SMS_RATE_LIMIT_PERIOD = 60 * 10
+
 
 CACHES = {
     "default": {
@@ -200,5 +219,66 @@ CACHES = {
     }
 }
 
+# Product list pages are cached per query and catalog generation. Orders do
+# not move the generation unless a product sells out or comes back in stock,
+# so list quantities may lag behind by up to this many seconds.
+PRODUCT_LIST_CACHE_TIMEOUT = 60 * 5
+
+# Product details are cached per product until it changes
+PRODUCT_DETAIL_CACHE_TIMEOUT = 60 * 60
+
+# Render product list pages from .values() rows instead of model instances
+PRODUCT_LIST_FAST_SERIALIZER = True
+
+# Lower bounds of the price bands reported in product list facets
+PRODUCT_PRICE_BUCKETS = [0, 25, 50, 100, 250, 500, 1000]
+
+# Rows inserted per bulk_create when importing products
+PRODUCT_IMPORT_BATCH_SIZE = 500
+
+# Rows fetched per round trip when exporting the catalog
+PRODUCT_EXPORT_CHUNK_SIZE = 2000
+
+# Full-text product search
+PRODUCT_SEARCH_BACKEND = "products.search.SQLiteSearchBackend"
+
+# Resized copies generated for uploaded product images, category icons and avatars
+IMAGE_VARIANT_SIZES = {"thumbnail": 200, "medium": 800}
+IMAGE_VARIANT_FORMATS = ("webp", "jpeg")
+IMAGE_VARIANT_QUALITY = 80
+
+# Stock taken by a pending order is given back after this many minutes
+# without changes to its items
+ORDER_RESERVATION_TTL_MINUTES = 30
+ORDER_RESERVATION_RELEASE_BATCH_SIZE = 500
+
+# Responses of creates sent with an Idempotency-Key header are replayed for
+# this long, retries are rejected while the first request holds the lock
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+
+# Order events are read from the outbox table in batches of ORDER_OUTBOX_BATCH_SIZE
+# every ORDER_OUTBOX_FLUSH_INTERVAL seconds. Every task gets up to
+# ORDER_OUTBOX_FLUSH_SIZE events, emails share one SMTP connection per task.
+# Dispatched events are kept for ORDER_OUTBOX_RETENTION_DAYS.
+ORDER_OUTBOX_BATCH_SIZE = 200
+ORDER_OUTBOX_FLUSH_SIZE = 50
+ORDER_OUTBOX_FLUSH_INTERVAL = 5.0
+ORDER_OUTBOX_RETENTION_DAYS = 7
+
 CELERY_BROKER_URL = "redis://127.0.0.1:6379/1"
-CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/1"
\ No newline at end of file
+CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/1"
+CELERY_BEAT_SCHEDULE = {
+    "release-expired-reservations": {
+        "task": "orders.tasks.release_expired_reservations",
+        "schedule": 60.0,
+    },
+    "dispatch-order-events": {
+        "task": "orders.tasks.dispatch_order_events",
+        "schedule": ORDER_OUTBOX_FLUSH_INTERVAL,
+    },
+    "purge-dispatched-order-events": {
+        "task": "orders.tasks.purge_dispatched_order_events",
+        "schedule": 60.0 * 60 * 24,
+    },
+}
\ No newline at end of file
@@ -15,4 +15,7 @@ DATABASES = {
         "HOST": config("DB_HOSTNAME"),
         "PORT": config("DB_PORT", cast=int),
     }
-}
\ No newline at end of file
+}
+
+
+PRODUCT_SEARCH_BACKEND = "products.search.PostgresSearchBackend"
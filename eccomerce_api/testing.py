@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+
+from products.models import Product, ProductCategory
+
+User = get_user_model()
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Test cases run against an in-memory cache instead of Redis
+use_locmem_cache = override_settings(CACHES=LOCMEM_CACHES)
+
+
+def create_user(username, **extra_fields):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", **extra_fields
+    )
+
+
+def create_products(count=1, seller=None, category=None, **fields):
+    """
+    Creates count products of seller in category, both made up if not given
+    """
+    seller = seller or create_user("seller")
+    category = category or ProductCategory.objects.create(name="Books")
+    fields = {"price": 10, "quantity": 10, **fields}
+
+    return [
+        Product.objects.create(seller=seller, category=category, name=f"Book {i}", **fields)
+        for i in range(count)
+    ]
+
+
+class QueryPlanAssertions:
+    """
+    Fails when a query shape falls back to a sequential scan of its table.
+
+    On SQLite ordered shapes must also be served in index order, without a
+    temporary sort. Postgres is checked with sequential scans disabled, so a
+    plan still using one means no index can serve the query.
+    """
+
+    def get_plan(self, queryset):
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}", params)
+                return [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, table, ordered=True):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest(f"No query plan check for {connection.vendor}")
+
+        plan = self.get_plan(queryset)
+        details = "\n".join(plan)
+
+        if connection.vendor == "postgresql":
+            self.assertNotIn(f"Seq Scan on {table}", details)
+            return
+
+        for detail in plan:
+            if detail.startswith(f"SCAN {table}"):
+                self.assertIn("INDEX", detail, details)
+        if ordered:
+            self.assertNotIn("TEMP B-TREE", details)
@@ -0,0 +1,70 @@
+import copy
+
+from django.db.models.fields.files import FieldFile
+
+
+def _snapshot(instance):
+    values = {}
+    for field in instance._meta.concrete_fields:
+        # Deferred fields are not in __dict__ and cannot have been changed
+        if field.attname not in instance.__dict__:
+            continue
+
+        value = instance.__dict__[field.attname]
+        values[field.attname] = value.name if isinstance(value, FieldFile) else copy.deepcopy(value)
+
+    return values
+
+
+class DirtyFieldsMixin:
+    """
+    Model mixin that remembers the values loaded from the database.
+
+    save() on a loaded instance skips the query when nothing changed and
+    otherwise only writes the changed fields, plus the auto_now ones.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = _snapshot(instance)
+        return instance
+
+    def get_dirty_fields(self):
+        """
+        Returns the names of the fields changed since the instance was
+        loaded or saved, None if it never was
+        """
+        loaded = getattr(self, "_loaded_values", None)
+        if self._state.adding or loaded is None:
+            return None
+
+        dirty = []
+        for field in self._meta.concrete_fields:
+            if field.attname not in loaded or field.attname not in self.__dict__:
+                continue
+
+            value = self.__dict__[field.attname]
+            # Files assigned but not written to the storage yet
+            if getattr(value, "_committed", True) is False or value != loaded[field.attname]:
+                dirty.append(field.name)
+
+        return dirty
+
+    def save(self, *args, **kwargs):
+        if kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            dirty = self.get_dirty_fields()
+
+            if dirty is not None:
+                if not dirty:
+                    return
+
+                auto_now = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if getattr(field, "auto_now", False) and field.name not in dirty
+                ]
+                kwargs["update_fields"] = dirty + auto_now
+
+        super().save(*args, **kwargs)
+        self._loaded_values = _snapshot(self)
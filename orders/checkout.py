@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from orders.models import Order, OrderItem
+
+
+@transaction.atomic
+def checkout_order(order_id, shipping_address=None, billing_address=None):
+    """
+    Completes a pending order and snapshots the prices of its items.
+
+    The stock of every item was taken when the item was written. Locking the
+    order and finding it still pending guarantees that stock was not given
+    back by the reservation sweep, and item writes, which all extend the
+    reservation on the order row first, wait for the checkout to finish.
+    """
+    order = Order.objects.select_for_update().get(pk=order_id)
+    if order.status != Order.PENDING:
+        raise serializers.ValidationError(_("Only pending orders can be checked out."))
+
+    order_items = list(order.order_items.select_related("product"))
+    if not order_items:
+        raise serializers.ValidationError(_("An order without items can't be checked out."))
+
+    updated_at = timezone.now()
+    total = Decimal(0)
+    for order_item in order_items:
+        order_item.unit_price = order_item.product.price
+        order_item.line_total = round(order_item.unit_price * order_item.quantity, 2)
+        order_item.updated_at = updated_at
+        total += order_item.line_total
+
+    OrderItem.objects.bulk_update(order_items, ["unit_price", "line_total", "updated_at"])
+
+    order.total = total
+    order.status = Order.COMPLETED
+    order.reserved_until = None
+    update_fields = ["total", "status", "reserved_until", "updated_at"]
+
+    if shipping_address is not None:
+        order.shipping_address = shipping_address
+        update_fields.append("shipping_address")
+    if billing_address is not None:
+        order.billing_address = billing_address
+        update_fields.append("billing_address")
+
+    order.save(update_fields=update_fields)
+    return order
@@ -0,0 +1,20 @@
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import APIException
+
+
+class IdempotencyKeyInUseException(APIException):
+    status_code = 409
+    default_detail = _("A request with this Idempotency-Key is still being processed.")
+    default_code = "idempotency-key-in-use"
+
+
+class IdempotencyKeyReusedException(APIException):
+    status_code = 422
+    default_detail = _("This Idempotency-Key was already used with a different request.")
+    default_code = "idempotency-key-reused"
+
+
+class InvalidIdempotencyKeyException(APIException):
+    status_code = 400
+    default_detail = _("The Idempotency-Key header must be at most 255 characters.")
+    default_code = "invalid-idempotency-key"
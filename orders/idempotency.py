@@ -0,0 +1,83 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from orders.exceptions import (
+    IdempotencyKeyInUseException,
+    IdempotencyKeyReusedException,
+    InvalidIdempotencyKeyException,
+)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_PREFIX = "idempotency"
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.path}\n{body}".encode()).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """
+    Replays the stored response when a create is retried with the same
+    Idempotency-Key header by the same user.
+
+    A short lock makes retries that arrive while the first request is still
+    running fail with 409 instead of creating a duplicate.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            raise InvalidIdempotencyKeyException()
+
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        cache_key = f"{IDEMPOTENCY_KEY_PREFIX}:{request.user.pk}:{digest}"
+        fingerprint = _fingerprint(request)
+
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return self._replay(stored, fingerprint)
+
+        lock_key = f"{cache_key}:lock"
+        lock_timeout = getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 30)
+        if not cache.add(lock_key, 1, timeout=lock_timeout):
+            raise IdempotencyKeyInUseException()
+
+        try:
+            # The first request may have finished between the get and the lock
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return self._replay(stored, fingerprint)
+
+            response = super().create(request, *args, **kwargs)
+            if 200 <= response.status_code < 300:
+                stored = {
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                    "location": response.get("Location"),
+                }
+                ttl = getattr(settings, "IDEMPOTENCY_KEY_TTL", 60 * 60 * 24)
+                cache.set(cache_key, stored, timeout=ttl)
+
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    def _replay(self, stored, fingerprint):
+        if stored["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReusedException()
+
+        headers = {"Idempotent-Replayed": "true"}
+        if stored["location"]:
+            headers["Location"] = stored["location"]
+
+        return Response(stored["data"], status=stored["status"], headers=headers)
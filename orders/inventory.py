@@ -0,0 +1,169 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from orders.models import Order, OrderItem, get_reservation_deadline
+from products.caching import bump_catalog_generation, invalidate_product_details
+from products.models import Product
+
+# Products updated per statement when giving back stock
+RELEASE_CHUNK_SIZE = 500
+
+
+def _invalidate_on_commit(product_ids, stock_crossed_zero=False):
+    """
+    Drops the cached details of the products once the stock move commits.
+
+    Cached list pages and facets keep their quantities until they expire,
+    unless a product sold out or came back in stock, which changes the
+    stock filters and facet counts and so moves the catalog generation.
+    """
+    product_ids = list(product_ids)
+
+    def invalidate():
+        invalidate_product_details(product_ids)
+        if stock_crossed_zero:
+            bump_catalog_generation()
+
+    transaction.on_commit(invalidate)
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def reserve_stock(quantities):
+    """
+    Takes stock for a {product id: quantity} mapping or raises ValidationError.
+
+    All products are decremented by a single conditional UPDATE, so concurrent
+    buyers never oversell and row locks are only held for the statement.
+    The update runs in a savepoint that is rolled back unless every product
+    had enough stock.
+    """
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return
+
+    requested = _quantity_case(quantities)
+    with transaction.atomic():
+        updated = Product.objects.filter(
+            pk__in=quantities, quantity__gte=requested
+        ).update(quantity=F("quantity") - requested)
+
+        if updated != len(quantities):
+            error = {"quantity": _("Ordered quantity is more than the stock.")}
+            raise serializers.ValidationError(error)
+
+    sold_out = Product.objects.filter(pk__in=quantities, quantity=0).exists()
+    _invalidate_on_commit(quantities, stock_crossed_zero=sold_out)
+
+
+def release_stock(quantities):
+    """
+    Gives back stock for a {product id: quantity} mapping
+    """
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity > 0}
+    product_ids = sorted(quantities)
+
+    restocked = False
+    for start in range(0, len(product_ids), RELEASE_CHUNK_SIZE):
+        chunk = {pk: quantities[pk] for pk in product_ids[start : start + RELEASE_CHUNK_SIZE]}
+        Product.objects.filter(pk__in=chunk).update(
+            quantity=F("quantity") + _quantity_case(chunk)
+        )
+        # Products left with exactly the released quantity were sold out
+        restocked = restocked or Product.objects.filter(
+            pk__in=chunk, quantity=_quantity_case(chunk)
+        ).exists()
+
+    _invalidate_on_commit(quantities, stock_crossed_zero=restocked)
+
+
+def move_reservations(held, needed):
+    """
+    Applies the net stock change between the {product id: quantity} an order
+    held and the one it needs now
+    """
+    to_reserve = {}
+    to_release = {}
+
+    for product_id in set(held) | set(needed):
+        delta = needed.get(product_id, 0) - held.get(product_id, 0)
+        if delta > 0:
+            to_reserve[product_id] = delta
+        elif delta < 0:
+            to_release[product_id] = -delta
+
+    release_stock(to_release)
+    reserve_stock(to_reserve)
+
+
+def item_quantities(items):
+    """
+    Sums quantities per product id for an iterable of (product id, quantity)
+    """
+    quantities = Counter()
+    for product_id, quantity in items:
+        quantities[product_id] += quantity
+
+    return quantities
+
+
+def extend_reservation(order_id):
+    """
+    Pushes back the reservation deadline of a pending order.
+
+    Raises ValidationError once the order is closed. The update locks the
+    order row, so item writes and checkout of the same order never overlap.
+    """
+    updated = Order.objects.filter(pk=order_id, status=Order.PENDING).update(
+        reserved_until=get_reservation_deadline()
+    )
+    if not updated:
+        raise serializers.ValidationError(
+            _("Creating, updating or deleting order items for a closed order is not allowed.")
+        )
+
+
+def release_expired_reservations(batch_size=None):
+    """
+    Expires pending orders past their reservation deadline and returns their
+    stock, one batch of orders per transaction.
+
+    Returns the number of expired orders.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, "ORDER_RESERVATION_RELEASE_BATCH_SIZE", 500)
+
+    expired = 0
+    while True:
+        with transaction.atomic():
+            order_ids = list(
+                Order.objects.select_for_update(skip_locked=True)
+                .filter(status=Order.PENDING, reserved_until__lt=timezone.now())
+                .order_by("reserved_until")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not order_ids:
+                return expired
+
+            quantities = dict(
+                OrderItem.objects.filter(order_id__in=order_ids)
+                .order_by()
+                .values("product_id")
+                .annotate(total=Sum("quantity"))
+                .values_list("product_id", "total")
+            )
+            release_stock(quantities)
+            Order.objects.filter(id__in=order_ids).update(status=Order.EXPIRED)
+
+        expired += len(order_ids)
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:12
+
+import orders.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_hot_query_indexes'),
+        ('users', '0002_profile_avatar_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Existing orders never took stock, leave their deadline empty so the
+        # expiry sweep does not give back stock they did not reserve.
+        migrations.AddField(
+            model_name='order',
+            name='reserved_until',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Stock reserved until'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='reserved_until',
+            field=models.DateTimeField(default=orders.models.get_reservation_deadline, editable=False, null=True, verbose_name='Stock reserved until'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('P', 'Pending'), ('C', 'Completed'), ('E', 'Expired')], default='P', max_length=1),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'reserved_until'], name='order_status_reserved_idx'),
+        ),
+    ]
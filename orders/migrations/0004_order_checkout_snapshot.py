@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Total at checkout'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='line_total',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Line total at checkout'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Unit price at checkout'),
+        ),
+    ]
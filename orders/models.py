@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from users.models import Address
 from products.models import Product
+from django.db.models.functions import Coalesce
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
@@ -10,22 +13,93 @@ from django.utils.translation import gettext_lazy as _
 User = get_user_model()
 
 
+def get_reservation_deadline():
+    ttl = getattr(settings, "ORDER_RESERVATION_TTL_MINUTES", 30)
+    return timezone.now() + timezone.timedelta(minutes=ttl)
+
+
+def _live_item_price():
+    return models.Subquery(
+        Product.objects.filter(pk=models.OuterRef("product_id")).order_by().values("price")[:1]
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotates total_cost, the snapshotted total of completed orders or
+        the live sum of the items otherwise
+        """
+        live_total = (
+            OrderItem.objects.filter(order=models.OuterRef("pk"))
+            .order_by()
+            .values("order")
+            .annotate(total=models.Sum(models.F("quantity") * _live_item_price()))
+            .values("total")
+        )
+        return self.annotate(
+            total_cost=Coalesce(
+                "total",
+                models.Subquery(live_total),
+                models.Value(0),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+
+class OrderItemQuerySet(models.QuerySet):
+    def with_live_prices(self):
+        """
+        Annotates live_price, only looked up for items without a snapshot
+        """
+        return self.annotate(
+            live_price=Coalesce(
+                "unit_price",
+                _live_item_price(),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+
+
 class Order(models.Model):
     PENDING = "P"
     COMPLETED = "C"
+    EXPIRED = "E"
     
-    STATUS_CHOICES = ((PENDING, _("Pending")), (COMPLETED, _("Completed")))
+    STATUS_CHOICES = (
+        (PENDING, _("Pending")),
+        (COMPLETED, _("Completed")),
+        (EXPIRED, _("Expired")),
+    )
     
     buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDING)
     shipping_address = models.ForeignKey(Address, related_name="shipping_orders", on_delete=models.SET_NULL, blank=True, null=True)
     billing_address = models.ForeignKey(Address, related_name="billing_orders", on_delete=models.SET_NULL, blank=True, null=True)
+    reserved_until = models.DateTimeField(
+        _("Stock reserved until"), null=True, default=get_reservation_deadline, editable=False
+    )
+    total = models.DecimalField(
+        _("Total at checkout"), max_digits=12, decimal_places=2, null=True, editable=False
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderQuerySet.as_manager()
     
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["buyer", "-created_at", "-id"],
+                name="order_buyer_created_idx",
+            ),
+            models.Index(
+                fields=["status", "reserved_until"],
+                name="order_status_reserved_idx",
+            ),
+        ]
         
     def __str__(self):
         return self.buyer.get_full_name()
@@ -37,6 +111,8 @@ class Order(models.Model):
         """
         Total cost of all the items in an order
         """
+        if self.total is not None:
+            return self.total
         return round(sum([order_item.cost for order_item in self.order_items.all()]), 2)
 
 
@@ -44,19 +120,75 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="order_items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="product_orders")
     quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(
+        _("Unit price at checkout"), max_digits=10, decimal_places=2, null=True, editable=False
+    )
+    line_total = models.DecimalField(
+        _("Line total at checkout"), max_digits=12, decimal_places=2, null=True, editable=False
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderItemQuerySet.as_manager()
     
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["order", "product"], name="orderitem_order_product_idx"),
+        ]
         
     def __str__(self):
         return self.order.buyer.get_full_name()
     
+    @cached_property
+    def price(self):
+        """
+        Unit price snapshotted at checkout, the live product price before
+        """
+        if self.unit_price is not None:
+            return self.unit_price
+
+        live_price = getattr(self, "live_price", None)
+        return live_price if live_price is not None else self.product.price
+
     @cached_property
     def cost(self):
         """
         Total Cost of the order item
         """
-        return round(self.product.price * self.quantity, 2)
\ No newline at end of file
+        if self.line_total is not None:
+            return self.line_total
+        return round(self.price * self.quantity, 2)
+
+class OrderEvent(models.Model):
+    """
+    Outbox of order side effects, written in the transaction of the order
+    and handed to Celery by orders.outbox.dispatch_events
+    """
+
+    ORDER_CONFIRMED = "order_confirmed"
+
+    EVENT_TYPES = (
+        (ORDER_CONFIRMED, _("Order confirmed")),
+    )
+
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, related_name="events", blank=True, null=True)
+    event_type = models.CharField(max_length=50, choices=EVENT_TYPES)
+    payload = models.JSONField(default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(dispatched_at__isnull=True),
+                name="orderevent_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk}"
@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import OrderEvent
+
+
+def record_event(order, event_type, **payload):
+    """
+    Adds an event to the outbox, call it inside the transaction writing order
+    so the event is committed or rolled back with it
+    """
+    return OrderEvent.objects.create(order=order, event_type=event_type, payload=payload)
+
+
+def dispatch_events(handlers, batch_size=None, flush_size=None):
+    """
+    Hands pending outbox events to the Celery task registered for their type
+    in handlers, one batch of events per transaction.
+
+    Each task gets a list of up to flush_size payloads of its event type, so
+    it can share a connection (an SMTP session for emails) between them.
+    Events are only marked dispatched once every task of the batch reached the
+    broker, so a broker failure leaves them for the next run. Returns the
+    number of dispatched events.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, "ORDER_OUTBOX_BATCH_SIZE", 200)
+    if flush_size is None:
+        flush_size = getattr(settings, "ORDER_OUTBOX_FLUSH_SIZE", 50)
+
+    dispatched = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                OrderEvent.objects.select_for_update(skip_locked=True)
+                .filter(dispatched_at__isnull=True)
+                .order_by("id")
+                .only("id", "event_type", "payload")[:batch_size]
+            )
+            if not events:
+                return dispatched
+
+            payloads = defaultdict(list)
+            for event in events:
+                payloads[event.event_type].append(event.payload)
+
+            for event_type, items in payloads.items():
+                for start in range(0, len(items), flush_size):
+                    handlers[event_type].delay(items[start : start + flush_size])
+
+            OrderEvent.objects.filter(id__in=[event.id for event in events]).update(
+                dispatched_at=timezone.now()
+            )
+
+        dispatched += len(events)
+
+
+def purge_dispatched_events(retention_days=None):
+    """
+    Deletes events dispatched more than retention_days ago
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, "ORDER_OUTBOX_RETENTION_DAYS", 7)
+
+    cutoff = timezone.now() - timezone.timedelta(days=retention_days)
+    deleted, _ = OrderEvent.objects.filter(dispatched_at__lt=cutoff).delete()
+    return deleted
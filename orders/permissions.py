@@ -1,6 +1,5 @@
 from rest_framework.permissions import BasePermission
 from django.utils.translation import gettext_lazy as _
-from django.shortcuts import get_object_or_404
 
 from orders.models import Order
 
@@ -20,15 +19,17 @@ class IsOrderPending(BasePermission):
 class IsOrderItemByBuyerOrAdmin(BasePermission):
     """
     Check if order item is owned by appropriate buyer or admin
+
+    The parent order comes from view.get_order, loaded once per request
     """
 
     def has_permission(self, request, view):
-        order_id = view.kwargs.get("order_id")
-        order = get_object_or_404(Order, id=order_id)
-        return order.buyer == request.user or request.user.is_staff
+        order = view.get_order()
+        return order.buyer_id == request.user.id or request.user.is_staff
 
     def has_object_permission(self, request, view, obj):
-        return obj.order.buyer == request.user or request.user.is_staff
+        order = view.get_order()
+        return order.buyer_id == request.user.id or request.user.is_staff
 
 
 class IsOrderByBuyerOrAdmin(BasePermission):
@@ -40,7 +41,7 @@ class IsOrderByBuyerOrAdmin(BasePermission):
         return request.user.is_authenticated is True
 
     def has_object_permission(self, request, view, obj):
-        return obj.buyer == request.user or request.user.is_staff
+        return obj.buyer_id == request.user.id or request.user.is_staff
 
 
 
@@ -54,15 +55,30 @@ class IsOrderItemPending(BasePermission):
     )
 
     def has_permission(self, request, view):
-        order_id = view.kwargs.get("order_id")
-        order = get_object_or_404(Order, id=order_id)
-
         if view.action in ("list",):
             return True
 
-        return order.status == "P"
+        return view.get_order().status == Order.PENDING
 
     def has_object_permission(self, request, view, obj):
         if view.action in ("retrieve",):
             return True
-        return obj.order.status == "P"
\ No newline at end of file
+        return view.get_order().status == Order.PENDING
+
+
+class ActionPermissionsMixin:
+    """
+    Checks the permission classes mapped to the current action in
+    action_permission_classes, permission_classes for any other action.
+
+    The mapping is built once with the class, get_permissions only looks the
+    action up.
+    """
+
+    action_permission_classes = {}
+
+    def get_permissions(self):
+        permission_classes = self.action_permission_classes.get(
+            self.action, self.permission_classes
+        )
+        return [permission() for permission in permission_classes]
@@ -1,8 +1,71 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
 
+from orders.inventory import (
+    extend_reservation,
+    item_quantities,
+    move_reservations,
+    reserve_stock,
+)
 from orders.models import Order, OrderItem
+from products.models import Product
+
+
+class OrderItemProductField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves products from the batch loaded by OrderItemListSerializer
+
+    Falls back to one query per item when used outside a list of items.
+    """
+
+    def to_internal_value(self, data):
+        products = getattr(self.parent.parent, "products", None)
+        if products is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            product_id = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        if product_id not in products:
+            self.fail("does_not_exist", pk_value=data)
+
+        return products[product_id]
+
+
+class OrderItemListSerializer(serializers.ListSerializer):
+    """
+    Validates all items of an order with a single product query
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            product_ids = set()
+            for item in data:
+                try:
+                    product_ids.add(int(item.get("product")))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.products = Product.objects.in_bulk(product_ids)
+
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        counts = Counter(item["product"].id for item in attrs if "product" in item)
+        if any(count > 1 for count in counts.values()):
+            error = _("Each product can only be added once to an order.")
+            raise serializers.ValidationError(error)
+
+        return attrs
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -10,6 +73,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
     Serializer class for serializing order items
     """
 
+    product = OrderItemProductField(queryset=Product.objects.all())
     price = serializers.SerializerMethodField()
     cost = serializers.SerializerMethodField()
 
@@ -26,31 +90,67 @@ class OrderItemSerializer(serializers.ModelSerializer):
             "updated_at",
         )
         read_only_fields = ("order",)
+        list_serializer_class = OrderItemListSerializer
 
     def validate(self, validated_data):
-        order_quantity = validated_data["quantity"]
-        product_quantity = validated_data["product"].quantity
+        product = validated_data.get("product", getattr(self.instance, "product", None))
+        if product is None:
+            # Partial items of an order keep the product of the item they
+            # replace, OrderWriteSerializer.update checks them
+            return validated_data
+
+        order_quantity = validated_data.get("quantity", getattr(self.instance, "quantity", 0))
+        product_quantity = product.quantity
+        in_order_items = isinstance(self.parent, serializers.ListSerializer)
 
-        order_id = self.context["view"].kwargs.get("order_id")
-        product = validated_data["product"]
-        current_item = OrderItem.objects.filter(order__id=order_id, product=product)
+        # Stock already reserved by this item is available to it again
+        if self.instance and self.instance.product_id == product.id:
+            product_quantity += self.instance.quantity
 
-        if order_quantity > product_quantity:
+        # Items sent with an existing order replace its items by position,
+        # their stock is checked when the order is saved
+        if order_quantity > product_quantity and not (in_order_items and self.root.instance):
             error = {"quantity": _("Ordered quantity is more than the stock.")}
             raise serializers.ValidationError(error)
 
-        if not self.instance and current_item.count() > 0:
-            error = {"product": _("Product already exists in your order.")}
-            raise serializers.ValidationError(error)
+        # Duplicates among the items of an order are checked by the list
+        if not self.instance and not in_order_items:
+            order_id = self.context["view"].kwargs.get("order_id")
+            if OrderItem.objects.filter(order__id=order_id, product=product).exists():
+                error = {"product": _("Product already exists in your order.")}
+                raise serializers.ValidationError(error)
 
-        if self.context["request"].user == product.seller:
+        if self.context["request"].user.id == product.seller_id:
             error = _("Adding your own product to your order is not allowed")
             raise PermissionDenied(error)
 
         return validated_data
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            reserve_stock({validated_data["product"].id: validated_data["quantity"]})
+            order_item = super().create(validated_data)
+            extend_reservation(order_item.order_id)
+
+        return order_item
+
+    def update(self, instance, validated_data):
+        product = validated_data.get("product", instance.product)
+        quantity = validated_data.get("quantity", instance.quantity)
+
+        with transaction.atomic():
+            move_reservations({instance.product_id: instance.quantity}, {product.id: quantity})
+            order_item = super().update(instance, validated_data)
+            extend_reservation(order_item.order_id)
+
+        # The live price was annotated for the product the item had before
+        for attname in ("live_price", "price", "cost"):
+            order_item.__dict__.pop(attname, None)
+
+        return order_item
+
     def get_price(self, obj):
-        return obj.product.price
+        return obj.price
 
     def get_cost(self, obj):
         return obj.cost
@@ -80,7 +180,32 @@ class OrderReadSerializer(serializers.ModelSerializer):
         )
 
     def get_total_cost(self, obj):
-        return obj.total_cost
+        # Annotated by OrderViewSet, computed from the items otherwise
+        total_cost = getattr(obj, "total_cost", None)
+        return total_cost if total_cost is not None else obj.total_price
+
+
+class OrderCheckoutSerializer(serializers.ModelSerializer):
+    """
+    Serializer class for checking out an order
+
+    Shipping and billing addresses are optional and must belong to the buyer
+    """
+
+    class Meta:
+        model = Order
+        fields = ("shipping_address", "billing_address")
+
+    def validate_address(self, address):
+        if address is not None and address.user_id != self.context["request"].user.id:
+            raise serializers.ValidationError(_("Address not found."))
+        return address
+
+    def validate_shipping_address(self, value):
+        return self.validate_address(value)
+
+    def validate_billing_address(self, value):
+        return self.validate_address(value)
 
 
 class OrderWriteSerializer(serializers.ModelSerializer):
@@ -106,24 +231,67 @@ class OrderWriteSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("status",)
 
+    @transaction.atomic
     def create(self, validated_data):
         orders_data = validated_data.pop("order_items")
         order = Order.objects.create(**validated_data)
 
-        for order_data in orders_data:
-            OrderItem.objects.create(order=order, **order_data)
+        reserve_stock(
+            item_quantities(
+                (order_data["product"].id, order_data["quantity"])
+                for order_data in orders_data
+            )
+        )
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=order, **order_data) for order_data in orders_data]
+        )
 
-        return order
+        return self.with_items(order)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         orders_data = validated_data.pop("order_items", None)
         orders = list((instance.order_items).all())
 
         if orders_data:
-            for order_data in orders_data:
-                order = orders.pop(0)
-                order.product = order_data.get("product", order.product)
-                order.quantity = order_data.get("quantity", order.quantity)
-                order.save()
+            held = Counter()
+            needed = Counter()
+            updated_at = timezone.now()
+            changed = []
+            added = []
+
+            for position, order_data in enumerate(orders_data):
+                if position < len(orders):
+                    order = orders[position]
+                    held[order.product_id] += order.quantity
+
+                    if "product" in order_data:
+                        order.product = order_data["product"]
+                    order.quantity = order_data.get("quantity", order.quantity)
+                    order.updated_at = updated_at
+                    changed.append(order)
+                else:
+                    # Items past the ones the order holds are added to it
+                    if not {"product", "quantity"} <= order_data.keys():
+                        error = _("New order items need a product and a quantity.")
+                        raise serializers.ValidationError({"order_items": error})
+
+                    order = OrderItem(order=instance, **order_data)
+                    added.append(order)
+
+                needed[order.product_id] += order.quantity
+
+            move_reservations(held, needed)
+            OrderItem.objects.bulk_update(changed, ["product", "quantity", "updated_at"])
+            OrderItem.objects.bulk_create(added)
+            extend_reservation(instance.id)
+
+        return self.with_items(instance)
 
-        return instance
+    def with_items(self, order):
+        """
+        Reloads the order with the items and products the response renders
+        """
+        return Order.objects.prefetch_related(
+            Prefetch("order_items", queryset=OrderItem.objects.select_related("product"))
+        ).get(pk=order.pk)
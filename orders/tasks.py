@@ -1,8 +1,89 @@
+from smtplib import SMTPException, SMTPRecipientsRefused
+
 from celery import shared_task
-from django.core.mail import send_mail
+from celery.utils.time import get_exponential_backoff_interval
+from django.core.mail import EmailMessage, get_connection, send_mail
 from django.conf import settings
 
+from orders import inventory, outbox
+from orders.models import OrderEvent
+
 
 @shared_task
 def send_email_task(subject, message, email):
-    send_mail(subject, message, settings.EMAIL_HOST_USER, [email])
\ No newline at end of file
+    send_mail(subject, message, settings.EMAIL_HOST_USER, [email])
+
+
+@shared_task(bind=True, max_retries=5)
+def send_emails_task(self, messages):
+    """
+    Sends a list of {subject, message, email} dicts over one SMTP connection
+
+    The outbox marks events dispatched once this task is queued, so delivery
+    errors are retried here instead of losing the batch. Only the messages
+    that failed are retried, refused recipients are dropped for good.
+    """
+    connection = get_connection()
+    sent = 0
+    unsent = []
+    error = None
+
+    try:
+        connection.open()
+    except (SMTPException, OSError) as exc:
+        unsent, error = messages, exc
+    else:
+        try:
+            for message in messages:
+                email = EmailMessage(
+                    message["subject"],
+                    message["message"],
+                    settings.EMAIL_HOST_USER,
+                    [message["email"]],
+                    connection=connection,
+                )
+                try:
+                    sent += email.send()
+                except SMTPRecipientsRefused:
+                    # Permanent, sending it again is refused again
+                    continue
+                except (SMTPException, OSError) as exc:
+                    unsent.append(message)
+                    error = exc
+        finally:
+            connection.close()
+
+    if unsent:
+        countdown = get_exponential_backoff_interval(
+            factor=1, retries=self.request.retries, maximum=600, full_jitter=True
+        )
+        raise self.retry(args=[unsent], exc=error, countdown=countdown)
+
+    return sent
+
+
+@shared_task
+def release_expired_reservations():
+    """
+    Gives back the stock held by pending orders past their reservation deadline
+    """
+    return inventory.release_expired_reservations()
+
+
+# Task run with the payloads of every type of order outbox event
+ORDER_EVENT_HANDLERS = {
+    OrderEvent.ORDER_CONFIRMED: send_emails_task,
+}
+
+
+@shared_task
+def dispatch_order_events():
+    """
+    Drains the order outbox to the handler task of every event
+    """
+    return outbox.dispatch_events(ORDER_EVENT_HANDLERS)
+
+
+@shared_task
+def purge_dispatched_order_events():
+    return outbox.purge_dispatched_events()
@@ -1,3 +1,450 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from unittest import mock
 
-# Create your tests here.
+from celery.exceptions import Retry
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db import OperationalError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from eccomerce_api.testing import (
+    QueryPlanAssertions,
+    create_products,
+    create_user,
+    use_locmem_cache,
+)
+from orders.inventory import release_expired_reservations, release_stock, reserve_stock
+from orders.models import Order, OrderEvent, OrderItem
+from orders.permissions import (
+    ActionPermissionsMixin,
+    IsOrderByBuyerOrAdmin,
+    IsOrderItemByBuyerOrAdmin,
+)
+from orders.tasks import ORDER_EVENT_HANDLERS, dispatch_order_events, send_emails_task
+from orders.views import OrderItemViewSet, OrderViewSet
+from products.caching import get_catalog_generation
+from products.models import Product
+
+
+@use_locmem_cache
+class StockCacheTests(TestCase):
+    def setUp(self):
+        (self.product,) = create_products(quantity=3)
+
+    def move_stock(self, move, quantity):
+        generation = get_catalog_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            move({self.product.pk: quantity})
+        return get_catalog_generation() - generation
+
+    def test_catalog_generation_moves_when_stock_crosses_zero(self):
+        self.assertEqual(self.move_stock(reserve_stock, 1), 0)
+        self.assertEqual(self.move_stock(reserve_stock, 2), 1)
+        self.assertEqual(self.move_stock(release_stock, 2), 1)
+        self.assertEqual(self.move_stock(release_stock, 1), 0)
+
+
+@use_locmem_cache
+class ReserveStockConcurrencyTests(TransactionTestCase):
+    def test_concurrent_reservations_never_oversell(self):
+        (product,) = create_products(quantity=5)
+
+        buyers = 12
+        barrier = threading.Barrier(buyers)
+        results = []
+
+        def reserve():
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        with transaction.atomic():
+                            reserve_stock({product.pk: 1})
+                        results.append(True)
+                        return
+                    except serializers.ValidationError:
+                        results.append(False)
+                        return
+                    except OperationalError:
+                        # SQLite rejects concurrent writers instead of waiting
+                        continue
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserve) for _ in range(buyers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(results.count(False), buyers - 5)
+        self.assertEqual(product.quantity, 0)
+
+
+@use_locmem_cache
+class OrderUpdateTests(APITestCase):
+    def setUp(self):
+        self.products = create_products(3)
+        self.buyer = create_user("buyer")
+        self.client.force_authenticate(self.buyer)
+
+        response = self.client.post(
+            "/api/user/orders/",
+            {"order_items": [{"product": self.products[0].id, "quantity": 1}]},
+            format="json",
+        )
+        self.order = Order.objects.get(pk=response.json()["id"])
+
+    def test_update_adds_items_past_the_existing_ones(self):
+        response = self.client.put(
+            f"/api/user/orders/{self.order.id}/",
+            {
+                "order_items": [
+                    {"product": self.products[0].id, "quantity": 2},
+                    {"product": self.products[1].id, "quantity": 3},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order.order_items.count(), 2)
+        quantities = Product.objects.filter(pk__in=[p.pk for p in self.products[:2]])
+        self.assertEqual(sorted(quantities.values_list("quantity", flat=True)), [7, 8])
+
+    def test_update_rejects_new_items_without_a_product(self):
+        response = self.client.patch(
+            f"/api/user/orders/{self.order.id}/",
+            {"order_items": [{"quantity": 1}, {"quantity": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.order.order_items.count(), 1)
+
+    def test_partial_update_of_an_item_keeps_its_product(self):
+        item = OrderItem.objects.get(order=self.order)
+        response = self.client.patch(
+            f"/api/user/orders/{self.order.id}/items/{item.id}/",
+            {"quantity": 4},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["product"], self.products[0].id)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].quantity, 6)
+
+    def test_update_of_an_item_prices_its_new_product(self):
+        Product.objects.filter(pk=self.products[1].pk).update(price="3.50")
+        item = OrderItem.objects.get(order=self.order)
+        response = self.client.put(
+            f"/api/user/orders/{self.order.id}/items/{item.id}/",
+            {"product": self.products[1].id, "quantity": 3},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["price"], 3.5)
+        self.assertEqual(response.json()["cost"], 10.5)
+
+
+@use_locmem_cache
+class OrderCheckoutTests(APITestCase):
+    def setUp(self):
+        self.products = create_products(2)
+        self.client.force_authenticate(create_user("buyer"))
+
+        response = self.client.post(
+            "/api/user/orders/",
+            {
+                "order_items": [
+                    {"product": self.products[0].id, "quantity": 1},
+                    {"product": self.products[1].id, "quantity": 3},
+                ]
+            },
+            format="json",
+        )
+        self.order = Order.objects.get(pk=response.json()["id"])
+
+    def test_price_changes_leave_a_completed_order_alone(self):
+        response = self.client.post(f"/api/user/orders/{self.order.id}/checkout/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total_cost"], 40)
+
+        Product.objects.filter(pk__in=[p.pk for p in self.products]).update(price="99.99")
+        response = self.client.get(f"/api/user/orders/{self.order.id}/")
+
+        data = response.json()
+        self.assertEqual(data["status"], Order.COMPLETED)
+        self.assertEqual(data["total_cost"], 40)
+        self.assertEqual([item["price"] for item in data["order_items"]], [10, 10])
+        self.assertEqual(sorted(item["cost"] for item in data["order_items"]), [10, 30])
+
+
+@use_locmem_cache
+class OrderDestroyTests(APITestCase):
+    def setUp(self):
+        (self.product,) = create_products()
+        self.client.force_authenticate(create_user("buyer"))
+
+        response = self.client.post(
+            "/api/user/orders/",
+            {"order_items": [{"product": self.product.id, "quantity": 2}]},
+            format="json",
+        )
+        self.order = Order.objects.get(pk=response.json()["id"])
+        self.item = self.order.order_items.get()
+
+    def expire_before(self, viewset):
+        """
+        Runs the expiry sweep after the permission checks passed, right
+        before the view releases the stock
+        """
+        perform_destroy = viewset.perform_destroy
+
+        def expire_then_destroy(view, instance):
+            Order.objects.filter(pk=self.order.pk).update(
+                reserved_until=timezone.now() - timedelta(minutes=1)
+            )
+            self.assertEqual(release_expired_reservations(), 1)
+            perform_destroy(view, instance)
+
+        return mock.patch.object(viewset, "perform_destroy", expire_then_destroy)
+
+    def test_item_of_an_expired_order_is_released_once(self):
+        with self.expire_before(OrderItemViewSet):
+            response = self.client.delete(
+                f"/api/user/orders/{self.order.id}/items/{self.item.id}/"
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(OrderItem.objects.filter(pk=self.item.pk).exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 10)
+
+    def test_expired_order_is_released_once(self):
+        with self.expire_before(OrderViewSet):
+            response = self.client.delete(f"/api/user/orders/{self.order.id}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 10)
+
+
+@use_locmem_cache
+class ActionPermissionsTests(APITestCase):
+    def setUp(self):
+        self.products = create_products(2, quantity=1000)
+        self.client.force_authenticate(create_user("buyer"))
+
+    def test_permissions_stay_fixed_across_requests(self):
+        order_permissions = OrderViewSet.permission_classes
+        item_permissions = OrderItemViewSet.permission_classes
+        get_permissions = ActionPermissionsMixin.get_permissions
+        counts = {}
+
+        def count_permissions(view):
+            permissions = get_permissions(view)
+            counts.setdefault((type(view), view.action), set()).add(len(permissions))
+            return permissions
+
+        with mock.patch.object(ActionPermissionsMixin, "get_permissions", count_permissions):
+            for _ in range(10):
+                order_id = self.client.post(
+                    "/api/user/orders/",
+                    {"order_items": [{"product": self.products[0].id, "quantity": 1}]},
+                    format="json",
+                ).json()["id"]
+                items_url = f"/api/user/orders/{order_id}/items/"
+                item_id = self.client.post(
+                    items_url, {"product": self.products[1].id, "quantity": 1}, format="json"
+                ).json()["id"]
+                self.client.patch(f"{items_url}{item_id}/", {"quantity": 2}, format="json")
+                self.client.delete(f"{items_url}{item_id}/")
+                self.client.patch(f"/api/user/orders/{order_id}/", {}, format="json")
+                response = self.client.post(f"/api/user/orders/{order_id}/checkout/")
+                self.assertEqual(response.status_code, 200)
+
+        self.assertIs(OrderViewSet.permission_classes, order_permissions)
+        self.assertEqual(OrderViewSet.permission_classes, (IsOrderByBuyerOrAdmin,))
+        self.assertIs(OrderItemViewSet.permission_classes, item_permissions)
+        self.assertEqual(OrderItemViewSet.permission_classes, (IsOrderItemByBuyerOrAdmin,))
+        self.assertEqual(
+            counts,
+            {
+                (OrderViewSet, "create"): {1},
+                (OrderViewSet, "partial_update"): {2},
+                (OrderViewSet, "checkout"): {2},
+                (OrderItemViewSet, "create"): {2},
+                (OrderItemViewSet, "partial_update"): {2},
+                (OrderItemViewSet, "destroy"): {2},
+            },
+        )
+
+
+class CountingEmailBackend(locmem.EmailBackend):
+    """
+    In-memory email backend counting the connections opened to send messages,
+    one per SMTP session with the real backend. Recipients in failures raise
+    their exception instead of receiving the message.
+    """
+
+    sessions = 0
+    failures = {}
+
+    def open(self):
+        CountingEmailBackend.sessions += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            for recipient in message.recipients():
+                if recipient in self.failures:
+                    raise self.failures[recipient]
+        return super().send_messages(messages)
+
+
+@use_locmem_cache
+@override_settings(
+    EMAIL_BACKEND="orders.tests.CountingEmailBackend",
+    ORDER_OUTBOX_BATCH_SIZE=200,
+    ORDER_OUTBOX_FLUSH_SIZE=50,
+)
+class OrderEmailDispatchTests(TestCase):
+    """
+    Harness for the order email throughput, swap EMAIL_BACKEND for the file
+    or SMTP backend and raise the event count to time a real run
+    """
+
+    def setUp(self):
+        CountingEmailBackend.sessions = 0
+        CountingEmailBackend.failures = {}
+
+    def queue_confirmations(self, count):
+        OrderEvent.objects.bulk_create(
+            OrderEvent(
+                event_type=OrderEvent.ORDER_CONFIRMED,
+                payload={
+                    "subject": "Order Confirmed",
+                    "message": f"Order {i} has been Confirmed.",
+                    "email": f"buyer{i}@example.com",
+                },
+            )
+            for i in range(count)
+        )
+
+    def test_confirmations_share_one_connection_per_flush(self):
+        self.queue_confirmations(120)
+
+        with mock.patch.object(send_emails_task, "delay", send_emails_task):
+            self.assertEqual(dispatch_order_events(), 120)
+
+        self.assertEqual(CountingEmailBackend.sessions, 3)
+        self.assertEqual(len(mail.outbox), 120)
+        self.assertFalse(OrderEvent.objects.filter(dispatched_at__isnull=True).exists())
+
+    def test_events_stay_pending_when_the_broker_fails(self):
+        self.queue_confirmations(3)
+
+        with mock.patch.object(send_emails_task, "delay", side_effect=OSError):
+            with self.assertRaises(OSError):
+                dispatch_order_events()
+
+        self.assertEqual(OrderEvent.objects.filter(dispatched_at__isnull=True).count(), 3)
+
+    def test_delivery_errors_retry_only_the_unsent_messages(self):
+        self.assertIs(ORDER_EVENT_HANDLERS[OrderEvent.ORDER_CONFIRMED], send_emails_task)
+        messages = [
+            {"subject": "Order Confirmed", "message": "", "email": f"buyer{i}@example.com"}
+            for i in range(5)
+        ]
+        CountingEmailBackend.failures = {
+            "buyer1@example.com": SMTPServerDisconnected(),
+            "buyer3@example.com": SMTPRecipientsRefused({"buyer3@example.com": (550, b"")}),
+        }
+
+        with mock.patch.object(send_emails_task, "retry", return_value=Retry()) as retry:
+            with self.assertRaises(Retry):
+                send_emails_task(messages)
+
+        self.assertEqual(retry.call_args.kwargs["args"], [[messages[1]]])
+        CountingEmailBackend.failures = {}
+        self.assertEqual(send_emails_task(*retry.call_args.kwargs["args"]), 1)
+
+        recipients = [email.to[0] for email in mail.outbox]
+        self.assertEqual(sorted(recipients), [messages[i]["email"] for i in (0, 1, 2, 4)])
+
+
+@use_locmem_cache
+class OrderQueryPlanTests(QueryPlanAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = create_user("buyer")
+
+    def test_buyer_order_page_uses_index(self):
+        queryset = Order.objects.filter(buyer=self.buyer).order_by("-created_at", "-id")[:21]
+        self.assertUsesIndex(queryset, "orders_order")
+
+    def test_order_item_duplicate_check_uses_index(self):
+        queryset = OrderItem.objects.filter(order_id=1, product_id=1).order_by()[:1]
+        self.assertUsesIndex(queryset, "orders_orderitem", ordered=False)
+
+
+@use_locmem_cache
+class OrderItemQueryTests(APITestCase):
+    """
+    Every order item action reads the parent order once
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(3)
+        cls.buyer = create_user("buyer")
+        cls.order = Order.objects.create(buyer=cls.buyer)
+        cls.item = OrderItem.objects.create(order=cls.order, product=cls.products[0], quantity=1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.buyer)
+        self.items_url = f"/api/user/orders/{self.order.id}/items/"
+        self.item_url = f"{self.items_url}{self.item.id}/"
+
+    def assertReadsOrderOnce(self, method, url, data=None, status_code=200):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format="json")
+
+        self.assertEqual(response.status_code, status_code, response.content)
+        order_reads = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT") and '"orders_order"' in query["sql"]
+        ]
+        self.assertEqual(len(order_reads), 1, order_reads)
+
+    def test_list(self):
+        self.assertReadsOrderOnce("get", self.items_url)
+
+    def test_create(self):
+        data = {"product": self.products[1].id, "quantity": 1}
+        self.assertReadsOrderOnce("post", self.items_url, data, status_code=201)
+
+    def test_retrieve(self):
+        self.assertReadsOrderOnce("get", self.item_url)
+
+    def test_update(self):
+        data = {"product": self.products[2].id, "quantity": 2}
+        self.assertReadsOrderOnce("put", self.item_url, data)
+
+    def test_partial_update(self):
+        self.assertReadsOrderOnce("patch", self.item_url, {"quantity": 2})
+
+    def test_destroy(self):
+        self.assertReadsOrderOnce("delete", self.item_url, status_code=204)
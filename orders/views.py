@@ -1,74 +1,162 @@
+from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets
-from .tasks import send_email_task
-from orders.models import Order, OrderItem
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from orders.checkout import checkout_order
+from orders.idempotency import IdempotentCreateMixin
+from orders.inventory import extend_reservation, item_quantities, release_stock
+from eccomerce_api.pagination import CreatedAtCursorPagination
+from orders.models import Order, OrderEvent, OrderItem
+from orders.outbox import record_event
 from orders.permissions import (
+    ActionPermissionsMixin,
     IsOrderByBuyerOrAdmin,
     IsOrderItemByBuyerOrAdmin,
     IsOrderItemPending,
     IsOrderPending,
 )
 from orders.serializers import (
+    OrderCheckoutSerializer,
     OrderItemSerializer,
     OrderReadSerializer,
     OrderWriteSerializer,
 )
 
 
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(ActionPermissionsMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     CRUD order items that are associated with the current order id.
     """
 
     queryset = OrderItem.objects.all()
     serializer_class = OrderItemSerializer
-    permission_classes = [IsOrderItemByBuyerOrAdmin]
+    permission_classes = (IsOrderItemByBuyerOrAdmin,)
+
+    action_permission_classes = {
+        "create": permission_classes + (IsOrderItemPending,),
+        "update": permission_classes + (IsOrderItemPending,),
+        "partial_update": permission_classes + (IsOrderItemPending,),
+        "destroy": permission_classes + (IsOrderItemPending,),
+    }
+
+    def get_order(self):
+        """
+        Parent order of the items, loaded once per request with its buyer
+        and shared by permissions, serializer and hooks.
+        """
+        if not hasattr(self, "_order"):
+            self._order = get_object_or_404(
+                Order.objects.select_related("buyer"), id=self.kwargs.get("order_id")
+            )
+
+        return self._order
 
     def get_queryset(self):
-        res = super().get_queryset()
+        res = super().get_queryset().with_live_prices()
         order_id = self.kwargs.get("order_id")
         return res.filter(order__id=order_id)
 
-    def perform_create(self, serializer):
-        order = get_object_or_404(Order, id=self.kwargs.get("order_id"))
-        serializer.save(order=order)
+    def get_object(self):
+        order_item = super().get_object()
+        order_item.order = self.get_order()
+        return order_item
 
-    def get_permissions(self):
-        if self.action in ("create", "update", "partial_update", "destroy"):
-            self.permission_classes += [IsOrderItemPending]
+    def perform_create(self, serializer):
+        serializer.save(order=self.get_order())
 
-        return super().get_permissions()
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Locks the order, so the expiry sweep can't release the item first
+        extend_reservation(instance.order_id)
+        release_stock({instance.product_id: instance.quantity})
+        instance.delete()
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ActionPermissionsMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     CRUD orders of a user
     """
 
     queryset = Order.objects.all()
-    permission_classes = [IsOrderByBuyerOrAdmin]
+    permission_classes = (IsOrderByBuyerOrAdmin,)
+
+    action_permission_classes = {
+        "update": permission_classes + (IsOrderPending,),
+        "partial_update": permission_classes + (IsOrderPending,),
+        "destroy": permission_classes + (IsOrderPending,),
+        "checkout": permission_classes + (IsOrderPending,),
+    }
+    pagination_class = CreatedAtCursorPagination
 
     def get_serializer_class(self):
         if self.action in ("create", "update", "partial_update", "destroy"):
             return OrderWriteSerializer
+        if self.action == "checkout":
+            return OrderCheckoutSerializer
 
         return OrderReadSerializer
     
+    @transaction.atomic
     def perform_create(self, serializer):
         order = serializer.save(buyer=self.request.user)
-        send_email_task.delay(
+        record_event(
+            order,
+            OrderEvent.ORDER_CONFIRMED,
             subject="Order Confirmed",
             message=f"Order {order.id} has been Confirmed.",
             email=self.request.user.email,
         )
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Re-read under lock, the expiry sweep may have released the stock already
+        instance.status = (
+            Order.objects.select_for_update()
+            .values_list("status", flat=True)
+            .get(pk=instance.pk)
+        )
+        if instance.status == Order.PENDING:
+            release_stock(
+                item_quantities(instance.order_items.values_list("product_id", "quantity"))
+            )
+        instance.delete()
+
     def get_queryset(self):
         res = super().get_queryset()
         user = self.request.user
-        return res.filter(buyer=user)
+        res = res.filter(buyer=user)
+
+        if self.action in ("list", "retrieve"):
+            res = self.with_read_relations(res)
+
+        return res
+
+    def with_read_relations(self, queryset):
+        """
+        Buyer and total in the main query, items in a single prefetch.
+
+        Completed orders read their snapshotted prices and total, the product
+        table is only looked up for pending ones.
+        """
+        return (
+            queryset.select_related("buyer")
+            .with_totals()
+            .prefetch_related(
+                Prefetch("order_items", queryset=OrderItem.objects.with_live_prices())
+            )
+        )
 
-    def get_permissions(self):
-        if self.action in ("update", "partial_update", "destroy"):
-            self.permission_classes += [IsOrderPending]
+    @action(detail=True, methods=["post"])
+    def checkout(self, request, pk=None):
+        """
+        Complete the order, snapshotting item prices and the order total.
+        """
+        order = self.get_object()
+        serializer = self.get_serializer(order, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checkout_order(order.id, **serializer.validated_data)
 
-        return super().get_permissions()
+        order = self.with_read_relations(self.get_queryset()).get(pk=order.id)
+        return Response(OrderReadSerializer(order, context=self.get_serializer_context()).data)
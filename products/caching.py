@@ -0,0 +1,173 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+from rest_framework.utils.encoders import JSONEncoder
+
+CATALOG_GENERATION_KEY = "products:generation"
+PRODUCT_LIST_KEY_PREFIX = "products:list"
+PRODUCT_DETAIL_KEY_PREFIX = "products:detail"
+PRODUCT_FACETS_KEY_PREFIX = "products:facets"
+
+LOCK_TIMEOUT = 10
+LOCK_WAIT_INTERVAL = 0.05
+LOCK_WAIT_ATTEMPTS = 20
+
+
+def get_catalog_generation():
+    """
+    Returns the current catalog generation, starting it at 1 if missing
+    """
+    cache.add(CATALOG_GENERATION_KEY, 1, timeout=None)
+    return cache.get(CATALOG_GENERATION_KEY, 1)
+
+
+def bump_catalog_generation():
+    """
+    Moves the catalog to a new generation.
+
+    Keys built for older generations are never read again and simply expire,
+    so a single product change does not delete anything shared.
+    """
+    try:
+        return cache.incr(CATALOG_GENERATION_KEY)
+    except ValueError:
+        cache.add(CATALOG_GENERATION_KEY, 1, timeout=None)
+        return cache.incr(CATALOG_GENERATION_KEY)
+
+
+def _query_digest(request, exclude=()):
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        if key not in exclude
+        for value in request.query_params.getlist(key)
+    )
+    raw = f"{request.get_host()}?{params}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def product_list_cache_key(request):
+    """
+    Builds the cache key of a product list page from its host, query
+    parameters (filters, page size and cursor) and the catalog generation
+    """
+    digest = _query_digest(request)
+    return f"{PRODUCT_LIST_KEY_PREFIX}:{get_catalog_generation()}:{digest}"
+
+
+def product_facets_cache_key(request, pagination_params=()):
+    """
+    Builds the cache key of the facet counts shared by every page of a
+    filtered product list
+    """
+    digest = _query_digest(request, exclude=pagination_params)
+    return f"{PRODUCT_FACETS_KEY_PREFIX}:{get_catalog_generation()}:{digest}"
+
+
+def _product_detail_version_key(product_id):
+    return f"{PRODUCT_DETAIL_KEY_PREFIX}:{product_id}:version"
+
+
+def get_product_detail_version(product_id):
+    """
+    Returns the version of the cached details of a product, starting it if
+    missing. A fresh version is a timestamp, so it never reuses the version of
+    details cached before the key was evicted.
+    """
+    key = _product_detail_version_key(product_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def product_detail_cache_key(request, product_id):
+    """
+    Builds the cache key of a product detail from the product version and
+    the scheme and host, which the absolute URLs of the payload embed
+    """
+    origin = hashlib.md5(request.build_absolute_uri("/").encode()).hexdigest()
+    version = get_product_detail_version(product_id)
+    return f"{PRODUCT_DETAIL_KEY_PREFIX}:{product_id}:{version}:{origin}"
+
+
+def payload_etag(data):
+    """
+    Returns a strong ETag hashed from the rendered product, so it changes
+    with anything the response shows (stock, category or seller names,
+    image variants) and not only when the product row is saved
+    """
+    raw = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_cached_product_detail(key):
+    """
+    Returns the cached (etag, data) pair of a product or None
+    """
+    return cache.get(key)
+
+
+def set_cached_product_detail(key, data, timeout=None):
+    """
+    Caches the rendered product with its ETag and returns the ETag.
+
+    Pass the key the detail was looked up with, a product changed since then
+    has a new version and never serves what the request read.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "PRODUCT_DETAIL_CACHE_TIMEOUT", 60 * 60)
+
+    etag = payload_etag(data)
+    cache.set(key, (etag, data), timeout=timeout)
+    return etag
+
+
+def invalidate_product_details(product_ids):
+    """
+    Moves the products to a new version, which drops their details cached
+    for every host at once
+    """
+    version = time.time_ns()
+    cache.set_many(
+        {_product_detail_version_key(pk): version for pk in product_ids}, timeout=None
+    )
+
+
+def get_or_build(key, builder, timeout=None):
+    """
+    Returns the cached value for key, building it with builder on a miss.
+
+    Only the caller holding the lock rebuilds the value, concurrent callers
+    wait briefly for it instead of all hitting the database at once.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "PRODUCT_LIST_CACHE_TIMEOUT", 60 * 5)
+
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        try:
+            value = builder()
+            cache.set(key, value, timeout=timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    for _ in range(LOCK_WAIT_ATTEMPTS):
+        time.sleep(LOCK_WAIT_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    # The rebuild is taking too long, serve this request without the cache
+    return builder()
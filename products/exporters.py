@@ -0,0 +1,77 @@
+import csv
+import json
+
+from django.conf import settings
+
+from products.models import Product
+from products.serializers import ProductFlatReadSerializer
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+CONTENT_TYPES = {
+    CSV: "text/csv",
+    NDJSON: "application/x-ndjson",
+}
+
+EXPORT_FIELDS = (
+    "id",
+    "seller",
+    "category",
+    "name",
+    "desc",
+    "image",
+    "price",
+    "quantity",
+    "created_at",
+    "updated_at",
+)
+
+
+class Echo:
+    """
+    File-like object whose write returns the value instead of buffering it
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_products(queryset=None, chunk_size=None, context=None):
+    """
+    Yields serialized products while holding a single chunk in memory.
+
+    Rows are streamed with .iterator(), which uses a server-side cursor on
+    Postgres, and rendered in chunks with ProductFlatReadSerializer.
+    """
+    if queryset is None:
+        queryset = Product.objects.order_by("id")
+    if chunk_size is None:
+        chunk_size = getattr(settings, "PRODUCT_EXPORT_CHUNK_SIZE", 2000)
+
+    rows = ProductFlatReadSerializer.get_rows(queryset).iterator(chunk_size=chunk_size)
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from ProductFlatReadSerializer(chunk, context=context).data
+            chunk = []
+
+    yield from ProductFlatReadSerializer(chunk, context=context).data
+
+
+def iter_export_lines(file_format, products):
+    """
+    Yields the lines of a CSV or NDJSON export of products
+    """
+    if file_format == CSV:
+        # Variant URLs do not fit a flat CSV row, NDJSON exports keep them
+        writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        yield writer.writeheader()
+        for product in products:
+            yield writer.writerow(product)
+        return
+
+    for product in products:
+        yield json.dumps(product) + "\n"
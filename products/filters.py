@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.db.models import Count, Q
+
+from products.models import Product
+
+
+def filter_products(queryset, filters):
+    """
+    Applies validated ProductFilterSerializer data to a product queryset
+    """
+    if filters.get("category") is not None:
+        queryset = queryset.filter(category_id=filters["category"])
+
+    if filters.get("seller") is not None:
+        queryset = queryset.filter(seller_id=filters["seller"])
+
+    if filters.get("min_price") is not None:
+        queryset = queryset.filter(price__gte=filters["min_price"])
+
+    if filters.get("max_price") is not None:
+        queryset = queryset.filter(price__lt=filters["max_price"])
+
+    if filters.get("in_stock") is True:
+        queryset = queryset.filter(quantity__gt=0)
+    elif filters.get("in_stock") is False:
+        queryset = queryset.filter(quantity__lte=0)
+
+    return queryset
+
+
+def get_price_buckets():
+    """
+    Returns (min, max) price bands, the last one has no upper bound
+    """
+    bounds = getattr(settings, "PRODUCT_PRICE_BUCKETS", [0, 25, 50, 100, 250, 500, 1000])
+    return list(zip(bounds, bounds[1:])) + [(bounds[-1], None)]
+
+
+def product_facets(filters):
+    """
+    Returns category, price band and stock counts for the filtered products.
+
+    Every facet ignores its own filter, so clients can show the counts of the
+    other choices for that facet.
+    """
+    queryset = Product.objects.order_by()
+
+    categories = (
+        filter_products(queryset, {**filters, "category": None})
+        .values("category_id", "category__name")
+        .annotate(count=Count("id"))
+        .order_by("-count", "category_id")
+    )
+
+    buckets = get_price_buckets()
+    price_counts = filter_products(
+        queryset, {**filters, "min_price": None, "max_price": None}
+    ).aggregate(
+        **{
+            f"bucket_{index}": Count(
+                "id",
+                filter=Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q()),
+            )
+            for index, (low, high) in enumerate(buckets)
+        }
+    )
+
+    stock_counts = filter_products(queryset, {**filters, "in_stock": None}).aggregate(
+        in_stock=Count("id", filter=Q(quantity__gt=0)),
+        out_of_stock=Count("id", filter=Q(quantity__lte=0)),
+    )
+
+    return {
+        "category": [
+            {
+                "id": row["category_id"],
+                "name": row["category__name"],
+                "count": row["count"],
+            }
+            for row in categories
+        ],
+        "price": [
+            {"min": low, "max": high, "count": price_counts[f"bucket_{index}"]}
+            for index, (low, high) in enumerate(buckets)
+        ],
+        "stock": stock_counts,
+    }
@@ -0,0 +1,150 @@
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from products.caching import bump_catalog_generation
+from products.models import Product, ProductCategory
+from products.search import get_search_backend
+from products.serializers import ProductImportRowSerializer
+
+CSV = "csv"
+JSONL = "jsonl"
+
+FORMAT_EXTENSIONS = {
+    ".csv": CSV,
+    ".jsonl": JSONL,
+    ".ndjson": JSONL,
+}
+
+
+def detect_format(filename):
+    """
+    Returns the import format matching the extension of filename or None
+    """
+    for extension, file_format in FORMAT_EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return file_format
+
+    return None
+
+
+def _decode_lines(fileobj, undecodable):
+    """
+    Yields the lines of a binary file decoded as UTF-8, adding the number of
+    every line that is not valid UTF-8 to undecodable
+    """
+    for line_number, line in enumerate(fileobj, start=1):
+        if line_number == 1:
+            line = line.removeprefix(codecs.BOM_UTF8)
+
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            undecodable.add(line_number)
+            yield line.decode("utf-8", errors="replace")
+
+
+def iter_rows(fileobj, file_format):
+    """
+    Yields (line number, row) pairs one line at a time from a binary file.
+
+    Rows that cannot be decoded or parsed are yielded as None so they are
+    reported instead of stopping the import.
+    """
+    undecodable = set()
+    lines = _decode_lines(fileobj, undecodable)
+
+    if file_format == CSV:
+        reader = csv.DictReader(lines)
+        first_line = 2
+        for row in reader:
+            # A quoted value can span lines, check every line of the row
+            if undecodable.intersection(range(first_line, reader.line_num + 1)):
+                row = None
+            yield reader.line_num, row
+            first_line = reader.line_num + 1
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if line_number in undecodable:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+class ProductImporter:
+    """
+    Validates rows one by one and inserts the valid ones in batches.
+
+    Each batch is written with a single bulk_create inside its own
+    transaction, so a bad row never rolls back the rows before it and the
+    file is never held in memory.
+    """
+
+    def __init__(self, seller, batch_size=None):
+        self.seller = seller
+        self.batch_size = batch_size or getattr(settings, "PRODUCT_IMPORT_BATCH_SIZE", 500)
+        self.categories = {}
+        self.created = 0
+        self.errors = []
+
+    def get_category_id(self, name):
+        if name not in self.categories:
+            category, _ = ProductCategory.objects.get_or_create(name=name)
+            self.categories[name] = category.id
+
+        return self.categories[name]
+
+    def flush(self, batch):
+        if not batch:
+            return
+
+        with transaction.atomic():
+            products = Product.objects.bulk_create(batch)
+            get_search_backend().index_many(products)
+
+        self.created += len(products)
+
+    def run(self, rows):
+        batch = []
+
+        for line_number, row in rows:
+            if row is None:
+                self.errors.append({"row": line_number, "errors": "Malformed row."})
+                continue
+
+            serializer = ProductImportRowSerializer(data=row)
+            if not serializer.is_valid():
+                self.errors.append({"row": line_number, "errors": serializer.errors})
+                continue
+
+            data = serializer.validated_data
+            batch.append(
+                Product(
+                    seller=self.seller,
+                    category_id=self.get_category_id(data["category"]),
+                    name=data["name"],
+                    desc=data["desc"],
+                    price=data["price"],
+                    quantity=data["quantity"],
+                )
+            )
+
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+
+        self.flush(batch)
+
+        if self.created:
+            bump_catalog_generation()
+
+        return {"created": self.created, "errors": self.errors}
@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from products.exporters import CSV, NDJSON, iter_export_lines, iter_products
+
+
+class Command(BaseCommand):
+    help = "Export the product catalog as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=(CSV, NDJSON), default=NDJSON)
+        parser.add_argument("--output", help="File to write, defaults to stdout")
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        products = iter_products(chunk_size=options["chunk_size"])
+        lines = iter_export_lines(options["format"], products)
+
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
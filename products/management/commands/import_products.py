@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importers import ProductImporter, detect_format, iter_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import products for a seller from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV, JSONL or NDJSON file to import")
+        parser.add_argument("--seller", required=True, help="Email of the seller")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        file_format = detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Only .csv, .jsonl and .ndjson files can be imported.")
+
+        try:
+            seller = User.objects.get(email=options["seller"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['seller']}.")
+
+        importer = ProductImporter(seller, batch_size=options["batch_size"])
+        with open(options["path"], "rb") as fileobj:
+            result = importer.run(iter_rows(fileobj, file_format))
+
+        for error in result["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result['created']} products, {len(result['errors'])} rows failed."
+            )
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productcategory',
+            name='icon_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -9,6 +9,7 @@ User = get_user_model()
 class ProductCategory(models.Model):
     name = models.CharField(_("Category Name"), max_length=120)
     icon = models.ImageField(upload_to="category_icons", null=True, blank=True)
+    icon_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -37,6 +38,7 @@ class Product(models.Model):
     name = models.CharField(max_length=200)
     desc = models.TextField(_("Description"), blank=True)
     image = models.ImageField(upload_to="product_images", null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     price = models.DecimalField(decimal_places=2, max_digits=10)
     quantity = models.IntegerField(default=1)
     
@@ -45,6 +47,18 @@ class Product(models.Model):
     
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="product_created_idx"),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="product_category_created_idx",
+            ),
+            models.Index(
+                fields=["seller", "-created_at", "-id"],
+                name="product_seller_created_idx",
+            ),
+            models.Index(fields=["price"], name="product_price_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,132 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from products.models import Product
+
+SQLITE_INDEX_TABLE = "products_product_fts"
+POSTGRES_SEARCH_CONFIG = "english"
+
+
+class BaseSearchBackend:
+    """
+    Inverted index over product name and description
+    """
+
+    def search(self, query, limit, offset):
+        """
+        Returns the ids of the products matching query, best match first
+        """
+        raise NotImplementedError
+
+    def index(self, product):
+        pass
+
+    def index_many(self, products):
+        """
+        Indexes bulk created products, which never send post_save
+        """
+        for product in products:
+            self.index(product)
+
+    def remove(self, product_id):
+        pass
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    FTS5 virtual table keyed by product id, kept in sync from signals
+    """
+
+    def _match_expression(self, query):
+        # Quote each term so user input is never parsed as FTS5 syntax and
+        # match on prefixes to support search as you type.
+        terms = re.findall(r"\w+", query)
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def search(self, query, limit, offset):
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SQLITE_INDEX_TABLE} "
+                f"WHERE {SQLITE_INDEX_TABLE} MATCH %s "
+                f"ORDER BY bm25({SQLITE_INDEX_TABLE}, 10.0, 1.0), rowid DESC "
+                "LIMIT %s OFFSET %s",
+                [expression, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SQLITE_INDEX_TABLE} WHERE rowid = %s", [product.pk]
+            )
+            cursor.execute(
+                f"INSERT INTO {SQLITE_INDEX_TABLE} (rowid, name, description) "
+                "VALUES (%s, %s, %s)",
+                [product.pk, product.name, product.desc],
+            )
+
+    def index_many(self, products):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SQLITE_INDEX_TABLE} (rowid, name, description) "
+                "VALUES (%s, %s, %s)",
+                [(product.pk, product.name, product.desc) for product in products],
+            )
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SQLITE_INDEX_TABLE} WHERE rowid = %s", [product_id]
+            )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Generated tsvector column with a GIN index.
+
+    Postgres recomputes the column on every write, so index and remove
+    have nothing to do.
+    """
+
+    def search(self, query, limit, offset):
+        if not query.strip():
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM products_product, "
+                "websearch_to_tsquery(%s, %s) AS query "
+                "WHERE search_vector @@ query "
+                "ORDER BY ts_rank(search_vector, query) DESC, id DESC "
+                "LIMIT %s OFFSET %s",
+                [POSTGRES_SEARCH_CONFIG, query, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    backend = getattr(
+        settings, "PRODUCT_SEARCH_BACKEND", "products.search.SQLiteSearchBackend"
+    )
+    return import_string(backend)()
+
+
+def search_products(query, limit, offset):
+    """
+    Returns the products matching query in rank order
+    """
+    product_ids = get_search_backend().search(query, limit, offset)
+    products = Product.objects.select_related("seller", "category").in_bulk(
+        product_ids
+    )
+
+    return [products[pk] for pk in product_ids if pk in products]
@@ -1,4 +1,8 @@
+from decimal import Decimal
+
 from rest_framework import serializers
+
+from eccomerce_api.images import variant_urls
 from .models import Product, ProductCategory
 
 class ProductCategoryReadSerializer(serializers.ModelSerializer):
@@ -6,11 +10,33 @@ class ProductCategoryReadSerializer(serializers.ModelSerializer):
     Serializer class for product categories
     """
 
+    icon_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductCategory
         fields = "__all__"
+
+    def get_icon_variants(self, obj):
+        storage = ProductCategory._meta.get_field("icon").storage
+        return variant_urls(obj.icon_variants, storage, self.context.get("request"))
         
         
+class ProductFilterSerializer(serializers.Serializer):
+    """
+    Serializer class for validating product list filters
+    """
+
+    category = serializers.IntegerField(required=False, min_value=1)
+    seller = serializers.IntegerField(required=False, min_value=1)
+    min_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, min_value=Decimal(0)
+    )
+    max_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, min_value=Decimal(0)
+    )
+    in_stock = serializers.BooleanField(required=False, allow_null=True)
+
+
 class ProductReadSerializer(serializers.ModelSerializer):
     """
     Serializer class for reading products
@@ -18,11 +44,98 @@ class ProductReadSerializer(serializers.ModelSerializer):
 
     seller = serializers.CharField(source="seller.get_full_name", read_only=True)
     category = serializers.CharField(source="category.name", read_only=True)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = "__all__"
+
+    def get_image_variants(self, obj):
+        storage = Product._meta.get_field("image").storage
+        return variant_urls(obj.image_variants, storage, self.context.get("request"))
         
+class ProductFlatReadSerializer:
+    """
+    Fast path for ProductReadSerializer on list responses
+
+    Rows come from .values() with the seller and category columns joined in
+    and are rendered without building a DRF field per value. The output
+    matches ProductReadSerializer.
+    """
+
+    columns = (
+        "id",
+        "seller__first_name",
+        "seller__last_name",
+        "category__name",
+        "name",
+        "desc",
+        "image",
+        "image_variants",
+        "price",
+        "quantity",
+        "created_at",
+        "updated_at",
+    )
+
+    price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+    datetime_field = serializers.DateTimeField()
+
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+
+    @classmethod
+    def get_rows(cls, queryset):
+        return queryset.values(*cls.columns)
+
+    def image_url(self, name):
+        if not name:
+            return None
+
+        url = Product._meta.get_field("image").storage.url(name)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def image_variant_urls(self, variants):
+        storage = Product._meta.get_field("image").storage
+        return variant_urls(variants, storage, self.context.get("request"))
+
+    @property
+    def data(self):
+        price = self.price_field.to_representation
+        timestamp = self.datetime_field.to_representation
+
+        return [
+            {
+                "id": row["id"],
+                "seller": f"{row['seller__first_name']} {row['seller__last_name']}".strip(),
+                "category": row["category__name"],
+                "image_variants": self.image_variant_urls(row["image_variants"]),
+                "name": row["name"],
+                "desc": row["desc"],
+                "image": self.image_url(row["image"]),
+                "price": price(row["price"]),
+                "quantity": row["quantity"],
+                "created_at": timestamp(row["created_at"]),
+                "updated_at": timestamp(row["updated_at"]),
+            }
+            for row in self.rows
+        ]
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    Serializer class for validating a single row of a product import
+    """
+
+    category = serializers.CharField(max_length=120, required=False, default="Others")
+    name = serializers.CharField(max_length=200)
+    desc = serializers.CharField(required=False, allow_blank=True, default="")
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal(0))
+    quantity = serializers.IntegerField(required=False, default=1)
+
+
 class ProductWriteSerializer(serializers.ModelSerializer):
     """
     Serializer class for writing products
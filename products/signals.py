@@ -1,9 +1,73 @@
 from django.db.models.signals import post_save, post_delete
+from django.contrib.auth import get_user_model
 from django.dispatch import receiver
-from .models import Product
-from django.core.cache import cache
+from .models import Product, ProductCategory
+from .caching import bump_catalog_generation, invalidate_product_details
+from .search import get_search_backend
+from .tasks import generate_category_icon_variants, generate_product_image_variants
+from eccomerce_api.images import schedule_image_variants
+
+User = get_user_model()
 
 @receiver(post_save, sender=Product)
 @receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
 def clear_product_cache(sender, **kwargs):
-    cache.delete("product_list")
+    bump_catalog_generation()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def clear_product_detail_cache(sender, instance, **kwargs):
+    invalidate_product_details([instance.pk])
+
+
+@receiver(post_save, sender=ProductCategory)
+def clear_category_product_details_cache(sender, instance, created, **kwargs):
+    """
+    Product details embed the category name, drop the ones of this category
+    """
+    if not created:
+        invalidate_product_details(
+            instance.product_list.values_list("id", flat=True)
+        )
+
+
+@receiver(post_save, sender=User)
+def clear_seller_product_cache(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Product lists and details embed the seller name, drop them when a seller
+    may have been renamed
+    """
+    if created or (update_fields and not {"first_name", "last_name"} & set(update_fields)):
+        return
+
+    product_ids = list(instance.products.values_list("id", flat=True))
+    if product_ids:
+        invalidate_product_details(product_ids)
+        bump_catalog_generation()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def schedule_product_image_variants(sender, instance, **kwargs):
+    schedule_image_variants(
+        instance, "image", "image_variants", generate_product_image_variants
+    )
+
+
+@receiver(post_save, sender=ProductCategory)
+def schedule_category_icon_variants(sender, instance, **kwargs):
+    schedule_image_variants(
+        instance, "icon", "icon_variants", generate_category_icon_variants
+    )
@@ -0,0 +1,36 @@
+from celery import shared_task
+
+from eccomerce_api.images import build_image_variants
+from products.caching import bump_catalog_generation, invalidate_product_details
+from products.models import Product, ProductCategory
+
+
+@shared_task
+def generate_product_image_variants(product_id):
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None or not product.image:
+        return
+
+    variants = build_image_variants(product.image)
+
+    # Skip the write if the image was replaced while the variants were built
+    updated = Product.objects.filter(pk=product_id, image=product.image.name).update(
+        image_variants=variants
+    )
+    if updated:
+        bump_catalog_generation()
+        invalidate_product_details([product_id])
+
+
+@shared_task
+def generate_category_icon_variants(category_id):
+    category = ProductCategory.objects.filter(pk=category_id).first()
+    if category is None or not category.icon:
+        return
+
+    variants = build_image_variants(category.icon)
+    updated = ProductCategory.objects.filter(
+        pk=category_id, icon=category.icon.name
+    ).update(icon_variants=variants)
+    if updated:
+        bump_catalog_generation()
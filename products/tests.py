@@ -1,3 +1,256 @@
-from django.test import TestCase
+import os
+import time
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from eccomerce_api.testing import (
+    QueryPlanAssertions,
+    create_products,
+    create_user,
+    use_locmem_cache,
+)
+from products.importers import ProductImporter
+from products.models import Product, ProductCategory
+from products.search import get_search_backend, search_products
+from products.serializers import ProductFlatReadSerializer, ProductReadSerializer
+
+
+@use_locmem_cache
+class ProductListTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sellers = [
+            create_user(f"seller{i}", first_name="Seller", last_name=str(i))
+            for i in range(3)
+        ]
+        categories = [ProductCategory.objects.create(name=f"Category {i}") for i in range(3)]
+        products = []
+        for i in range(40):
+            product = Product(
+                seller=sellers[i % 3],
+                category=categories[i % 3],
+                name=f"Product {i}",
+                desc="Description",
+                price=f"{i}.50",
+                quantity=i % 4,
+            )
+            if i % 2:
+                product.image = f"product_images/{i}.jpg"
+                product.image_variants = {
+                    "source": product.image.name,
+                    "files": {"thumbnail_webp": f"product_images/variants/{i}.webp"},
+                }
+            products.append(product)
+
+        Product.objects.bulk_create(products)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        for page_size in (2, 30):
+            cache.clear()
+            with self.assertNumQueries(4):
+                response = self.client.get(f"/api/products/?page_size={page_size}")
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["results"]), page_size)
+
+    def test_flat_serializer_matches_read_serializer(self):
+        request = Request(APIRequestFactory().get("/api/products/"))
+        context = {"request": request}
+        queryset = Product.objects.select_related("seller", "category").order_by("id")
+
+        flat = ProductFlatReadSerializer(
+            ProductFlatReadSerializer.get_rows(queryset), context=context
+        ).data
+        read = ProductReadSerializer(queryset, many=True, context=context).data
+
+        self.assertEqual(flat, [dict(product) for product in read])
+
+
+@use_locmem_cache
+class ProductQueryPlanTests(QueryPlanAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_user("seller")
+        cls.category = ProductCategory.objects.create(name="Books")
+
+    def newest_first(self, queryset):
+        return queryset.order_by("-created_at", "-id")[:21]
+
+    def test_catalog_page_uses_index(self):
+        self.assertUsesIndex(self.newest_first(Product.objects.all()), "products_product")
+
+    def test_category_page_uses_index(self):
+        queryset = Product.objects.filter(category=self.category)
+        self.assertUsesIndex(self.newest_first(queryset), "products_product")
+
+    def test_seller_page_uses_index(self):
+        queryset = Product.objects.filter(seller=self.seller)
+        self.assertUsesIndex(self.newest_first(queryset), "products_product")
+
+
+@use_locmem_cache
+@override_settings(ALLOWED_HOSTS=["testserver", "shop.example.com"])
+class ProductDetailCacheTests(APITestCase):
+    def setUp(self):
+        (self.product,) = create_products(image="product_images/book.jpg")
+        self.url = f"/api/products/{self.product.id}/"
+
+    def get_image(self, host):
+        response = self.client.get(self.url, HTTP_HOST=host)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["image"], response["ETag"]
+
+    def test_details_are_cached_per_host(self):
+        image, etag = self.get_image("testserver")
+        other_image, other_etag = self.get_image("shop.example.com")
+
+        self.assertTrue(image.startswith("http://testserver/"))
+        self.assertTrue(other_image.startswith("http://shop.example.com/"))
+        self.assertNotEqual(etag, other_etag)
+        self.assertEqual(self.get_image("testserver"), (image, etag))
+
+    def test_saving_a_product_refreshes_every_host(self):
+        etags = [self.get_image(host)[1] for host in ("testserver", "shop.example.com")]
+
+        self.product.price = 12
+        self.product.save()
+
+        for host, etag in zip(("testserver", "shop.example.com"), etags):
+            with self.subTest(host=host):
+                self.assertNotEqual(self.get_image(host)[1], etag)
+
+
+def search(query, limit=20, offset=0):
+    return [product.name for product in search_products(query, limit, offset)]
+
+
+@use_locmem_cache
+@skipUnless(connection.vendor == "sqlite", "FTS5 index only exists on SQLite")
+class ProductSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_user("seller")
+        cls.category = ProductCategory.objects.create(name="Books")
+
+    def create_product(self, name, desc=""):
+        return Product.objects.create(
+            seller=self.seller, category=self.category, name=name, desc=desc, price=10
+        )
+
+    def test_index_follows_saves_and_deletes(self):
+        product = self.create_product("Kettle")
+        self.assertEqual(search("kettle"), ["Kettle"])
+
+        product.name = "Toaster"
+        product.save()
+        self.assertEqual(search("kettle"), [])
+        self.assertEqual(search("toaster"), ["Toaster"])
+
+        product.delete()
+        self.assertEqual(search("toaster"), [])
+
+    def test_imported_products_are_indexed(self):
+        rows = [
+            (1, {"name": "Imported kettle", "price": "5.00"}),
+            (2, {"name": "Imported toaster", "desc": "Two slices", "price": "8.00"}),
+        ]
+        result = ProductImporter(self.seller).run(rows)
+
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(sorted(search("imported")), ["Imported kettle", "Imported toaster"])
+        self.assertEqual(search("slices"), ["Imported toaster"])
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.create_product("Copper pan")
+        self.create_product("Kettle", desc="Copper")
+        self.create_product("Teapot")
+
+        self.assertEqual(search("copper"), ["Copper pan", "Kettle"])
+
+    def test_terms_match_as_prefixes(self):
+        self.create_product("Kettle")
+        self.create_product("Ketchup")
+
+        self.assertEqual(search("ket"), ["Ketchup", "Kettle"])
+        self.assertEqual(search("kett"), ["Kettle"])
+
+    def test_fts_syntax_is_matched_as_plain_terms(self):
+        self.create_product("Kettle")
+        self.create_product("Teapot")
+
+        for query in ('"kettle', "-kettle", "kettle*", "^kettle", "(kettle)", "kettle:"):
+            with self.subTest(query=query):
+                self.assertEqual(search(query), ["Kettle"])
+
+        # Operators are plain words every match must contain
+        for query in ("kettle OR teapot", "kettle NOT teapot", "NEAR(kettle teapot)"):
+            with self.subTest(query=query):
+                self.assertEqual(search(query), [])
+
+        self.assertEqual(search('"* ^'), [])
+
+    def test_endpoint_pages_ranked_results(self):
+        for name in ("Kettle one", "Kettle two", "Kettle three"):
+            self.create_product(name)
+
+        response = self.client.get("/api/products/search/", {"q": "kettle", "page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product["name"] for product in response.json()["results"]],
+            ["Kettle three", "Kettle two"],
+        )
+        self.assertIsNotNone(response.json()["next"])
+
+
+@use_locmem_cache
+@skipUnless(
+    os.environ.get("PRODUCT_SEARCH_BENCHMARK"),
+    "Set PRODUCT_SEARCH_BENCHMARK=<product count> to time search over a large catalog",
+)
+class ProductSearchBenchmark(TestCase):
+    """
+    Times ranked search pages over PRODUCT_SEARCH_BENCHMARK products, e.g.
+    PRODUCT_SEARCH_BENCHMARK=1000000 python manage.py test products.tests.ProductSearchBenchmark
+    """
+
+    words = ("kettle", "toaster", "copper", "steel", "blender", "teapot", "mixer", "grill")
+    batch_size = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        (product,) = create_products()
+        count = int(os.environ["PRODUCT_SEARCH_BENCHMARK"])
+        backend = get_search_backend()
+
+        for start in range(0, count, cls.batch_size):
+            products = Product.objects.bulk_create(
+                Product(
+                    seller_id=product.seller_id,
+                    category_id=product.category_id,
+                    name=f"{cls.words[i % 8]} {cls.words[i // 8 % 8]} {i}",
+                    desc=f"{cls.words[i // 64 % 8]} model {i}",
+                    price=10,
+                )
+                for i in range(start, min(start + cls.batch_size, count))
+            )
+            backend.index_many(products)
+
+    def test_search_pages(self):
+        count = int(os.environ["PRODUCT_SEARCH_BENCHMARK"])
+        for query in ("kettle", "kettle copper", "tea", f"model {count // 2}"):
+            for page in (0, 50):
+                started = time.perf_counter()
+                products = search_products(query, 21, page * 20)
+                elapsed = time.perf_counter() - started
+
+                print(f"{query!r} page {page + 1}: {len(products)} rows in {elapsed * 1000:.1f}ms")
+                if page == 0:
+                    self.assertTrue(products)
@@ -1,9 +1,30 @@
-from rest_framework import permissions, viewsets
-from django.core.cache import cache
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import parse_etags
+from django.utils.translation import gettext_lazy as _
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from eccomerce_api.pagination import CreatedAtCursorPagination, RankedPagination
+from products.caching import (
+    get_cached_product_detail,
+    get_or_build,
+    product_detail_cache_key,
+    product_facets_cache_key,
+    product_list_cache_key,
+    set_cached_product_detail,
+)
+from products.exporters import CONTENT_TYPES, NDJSON, iter_export_lines, iter_products
+from products.filters import filter_products, product_facets
+from products.importers import ProductImporter, detect_format, iter_rows
 from products.models import Product, ProductCategory
 from products.permissions import IsSellerOrAdmin
+from products.search import search_products
 from products.serializers import (
     ProductCategoryReadSerializer,
+    ProductFilterSerializer,
+    ProductFlatReadSerializer,
     ProductReadSerializer,
     ProductWriteSerializer,
 )
@@ -24,7 +45,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     CRUD products
     """
 
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related("seller", "category")
+    pagination_class = CreatedAtCursorPagination
 
     def get_serializer_class(self):
         if self.action in ("create", "update", "partial_update", "destroy"):
@@ -33,7 +55,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         return ProductReadSerializer
 
     def get_permissions(self):
-        if self.action in ("create",):
+        if self.action in ("create", "import_products", "export"):
             self.permission_classes = (permissions.IsAuthenticated,)
         elif self.action in ("update", "partial_update", "destroy"):
             self.permission_classes = (IsSellerOrAdmin,)
@@ -41,19 +63,139 @@ class ProductViewSet(viewsets.ModelViewSet):
             self.permission_classes = (permissions.AllowAny,)
 
         return super().get_permissions()
-    
-    
+
+    def get_filters(self):
+        """
+        Validated category, seller, price and stock filters of the request.
+        """
+        if not hasattr(self, "_filters"):
+            serializer = ProductFilterSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            self._filters = serializer.validated_data
+
+        return self._filters
+
     def get_queryset(self):
+        queryset = super().get_queryset()
+
+        if self.action == "list":
+            queryset = filter_products(queryset, self.get_filters())
+
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Cache rendered product list pages per query and catalog generation.
+
+        Facet counts are cached separately so every page of the same filtered
+        list shares them.
+        """
+        filters = self.get_filters()
+        pagination_params = (
+            self.paginator.cursor_query_param,
+            self.paginator.page_size_query_param,
+        )
+
+        def build():
+            if getattr(settings, "PRODUCT_LIST_FAST_SERIALIZER", True):
+                data = self._fast_list(request).data
+            else:
+                data = super(ProductViewSet, self).list(request, *args, **kwargs).data
+
+            data["facets"] = get_or_build(
+                product_facets_cache_key(request, pagination_params),
+                lambda: product_facets(filters),
+            )
+            return data
+
+        data = get_or_build(product_list_cache_key(request), build)
+        return Response(data)
+
+    def _fast_list(self, request):
+        rows = ProductFlatReadSerializer.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        serializer = ProductFlatReadSerializer(page, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve cached product details and answer If-None-Match with 304.
+        """
+        product_id = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        cache_key = product_detail_cache_key(request, product_id)
+        cached = get_cached_product_detail(cache_key)
+
+        if cached is None:
+            instance = self.get_object()
+            data = self.get_serializer(instance).data
+            etag = set_cached_product_detail(cache_key, data)
+        else:
+            etag, data = cached
+
+        if self._etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        return Response(data, headers={"ETag": etag})
+
+    def _etag_matches(self, request, etag):
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        return etag in etags or "*" in etags
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """
+        Full-text search over product name and description, best match first.
+        """
+        query = request.query_params.get("q", "")
+        paginator = RankedPagination()
+        products = paginator.paginate_results(
+            lambda limit, offset: search_products(query, limit, offset), request
+        )
+        serializer = self.get_serializer(products, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=(MultiPartParser,),
+    )
+    def import_products(self, request):
         """
-        Cache product list for performance optimization.
+        Import products of the current user from an uploaded CSV or JSONL file.
         """
-        cache_key = "product_list"
-        cached_products = cache.get(cache_key)
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"file": _("No file was submitted.")}, status=status.HTTP_400_BAD_REQUEST
+            )
 
-        if cached_products:
-            return cached_products 
+        file_format = detect_format(upload.name)
+        if file_format is None:
+            return Response(
+                {"file": _("Only .csv, .jsonl and .ndjson files can be imported.")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = ProductImporter(request.user).run(iter_rows(upload, file_format))
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Stream the whole catalog as CSV or NDJSON (?file_format=csv|ndjson).
+        """
+        file_format = request.query_params.get("file_format", NDJSON)
+        if file_format not in CONTENT_TYPES:
+            return Response(
+                {"file_format": _("Choose csv or ndjson.")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        # If cache is empty, fetch from DB and store in cache
-        products = Product.objects.all()
-        cache.set(cache_key, products, timeout=60 * 5)  # Cache for 5 minutes
-        return products
+        products = iter_products(context={"request": request})
+        response = StreamingHttpResponse(
+            iter_export_lines(file_format, products),
+            content_type=CONTENT_TYPES[file_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="products.{file_format}"'
+        return response
@@ -0,0 +1,70 @@
+import phonenumbers
+from allauth.account.models import EmailAddress
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Exists, OuterRef
+from phonenumbers.phonenumberutil import NumberParseException
+
+from users.caching import get_cached_user
+
+
+User = get_user_model()
+
+
+class CredentialsAuthBackend(ModelBackend):
+    """
+    Custom authentication backend to login users using email address or
+    phone number.
+
+    The user is loaded with its phone number and an email_verified flag in a
+    single query, so the login checks need no further lookups.
+    """
+
+    def get_lookup(self, username):
+        """
+        Returns the user filter for an email address or a phone number, None
+        when username is neither
+        """
+        if "@" in username:
+            return {"email": username}
+
+        try:
+            number = phonenumbers.parse(username, region=settings.PHONENUMBER_DEFAULT_REGION)
+        except NumberParseException:
+            return None
+
+        if not phonenumbers.is_valid_number(number):
+            return None
+
+        return {"phone_number__phone_number": number}
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if not username or password is None:
+            return
+
+        lookup = self.get_lookup(str(username))
+        if lookup is None:
+            return
+
+        verified_email = EmailAddress.objects.filter(
+            user=OuterRef("pk"), email=OuterRef("email"), verified=True
+        )
+        user = (
+            User.objects.select_related("phone_number")
+            .annotate(email_verified=Exists(verified_email))
+            .filter(**lookup)
+            .first()
+        )
+
+        if user is None:
+            # Hash anyway so unknown accounts take as long as wrong passwords
+            User().set_password(password)
+            return
+
+        if user.check_password(password):
+            return user
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if self.user_can_authenticate(user) else None
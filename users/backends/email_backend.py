@@ -1,27 +0,0 @@
-from django.contrib.auth import get_user_model
-from django.contrib.auth.backends import ModelBackend
-
-
-User = get_user_model()
-
-
-class EmailAuthBackend(ModelBackend):
-    """
-    Custom authentication backend to login users using email address.
-    """
-    
-    def authenticate(self, request, username=None, password=None):
-        try:
-            user = User.objects.get(email=username)
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
-            return 
-        
-    def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        
-        except User.DoesNotExist:
-            return None
-        
\ No newline at end of file
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+USER_KEY_PREFIX = "users:auth"
+USER_DETAIL_KEY_PREFIX = "users:detail"
+
+User = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f"{USER_KEY_PREFIX}:{user_id}"
+
+
+def get_cached_user(user_id):
+    """
+    Returns the user with user_id from a short lived snapshot, loading it on
+    a miss, or None if there is no such user
+    """
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is not None:
+        return user
+
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        timeout = getattr(settings, "USER_AUTH_CACHE_TIMEOUT", 60)
+        cache.set(key, user, timeout=timeout)
+
+    return user
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def user_detail_cache_key(user_id):
+    return f"{USER_DETAIL_KEY_PREFIX}:{user_id}"
+
+
+def get_cached_user_detail(user_id):
+    """
+    Returns the cached /api/user/ payload of a user or None
+    """
+    return cache.get(user_detail_cache_key(user_id))
+
+
+def set_cached_user_detail(user_id, data, timeout=None):
+    if timeout is None:
+        timeout = getattr(settings, "USER_DETAIL_CACHE_TIMEOUT", 60 * 60)
+
+    cache.set(user_detail_cache_key(user_id), data, timeout=timeout)
+
+
+def invalidate_user_detail(user_id):
+    cache.delete(user_detail_cache_key(user_id))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_profile_avatar_variants'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='phonenumber',
+            name='security_code',
+        ),
+        migrations.RemoveField(
+            model_name='phonenumber',
+            name='sent',
+        ),
+    ]
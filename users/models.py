@@ -1,24 +1,23 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-from twilio.rest import Client
-from django.utils import timezone
-from rest_framework.exceptions import NotAcceptable
-from twilio.base.exceptions import TwilioRestException
+from rest_framework.exceptions import NotAcceptable, Throttled
 from django.utils.translation import gettext_lazy as _
 from django.utils.crypto import get_random_string
 from django_countries.fields import CountryField
 from django.contrib.auth import get_user_model
 from phonenumber_field.modelfields import PhoneNumberField
 
+from eccomerce_api.tracking import DirtyFieldsMixin
+from users.otp import store_code, verify_code
+from users.sms import allow_sms
+
 
 User = get_user_model()
 
 class PhoneNumber(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='phone_number')
     phone_number = PhoneNumberField(unique=True)
-    security_code = models.CharField(max_length=100)
     is_verified = models.BooleanField(default=False)
-    sent = models.DateTimeField(null=True)
     
     updated_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -38,39 +37,24 @@ class PhoneNumber(models.Model):
         return get_random_string(length=token_length, allowed_chars='0123456789')
     
     
-    def is_security_code_expired(self):
-        """
-        Checks if the security code has expired
-        """
-        
-        expiration_date = self.sent + timezone.timedelta(minutes=settings.TOKEN_EXPIRE_MINUTES)
-        return expiration_date <= timezone.now()
-    
-    
     def send_confirmation(self):
         """
-        Sends the confirmation code to the user
+        Queues a new confirmation code for the user, at most SMS_RATE_LIMIT
+        times per SMS_RATE_LIMIT_PERIOD for a phone number.
+
+        The code is only kept in the cache, see users.otp.
         """
-        twilio_account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID')
-        twilio_auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN')
-        twilio_phone_number = getattr(settings, 'TWILIO_PHONE_NUMBER')
-        
-        self.security_code = self.generate_security_code()
-        
-        if all([twilio_account_sid, twilio_auth_token, twilio_phone_number]):
-            try:
-                twilio_client = Client(twilio_account_sid, twilio_auth_token)
-                twilio_client.messages.create(
-                    body=f"Your verification code is {self.security_code}",
-                    to=str(self.phone_number),
-                    from_=twilio_phone_number
-                )
-                self.sent = timezone.now()
-                self.save()
-                
-            except TwilioRestException as e:
-                print(e)
-                return False
+        from users.tasks import send_sms_task
+
+        phone_number = str(self.phone_number)
+        if not allow_sms(phone_number):
+            raise Throttled(detail=_("Too many verification codes requested, try again later."))
+
+        security_code = self.generate_security_code()
+        store_code(phone_number, security_code)
+
+        body = f"Your verification code is {security_code}"
+        transaction.on_commit(lambda: send_sms_task.delay(phone_number, body))
             
     
     def check_verification(self, security_code):
@@ -78,9 +62,9 @@ class PhoneNumber(models.Model):
         Checks if the security code is valid
         """
         
-        if all([self.security_code == security_code, not self.is_verified, not self.is_security_code_expired() ]):
+        if not self.is_verified and verify_code(str(self.phone_number), security_code):
             self.is_verified = True
-            self.save()
+            self.save(update_fields=["is_verified", "updated_at"])
             
         else:
             raise NotAcceptable(
@@ -89,9 +73,10 @@ class PhoneNumber(models.Model):
                 )
             )
             
-class Profile(models.Model):
+class Profile(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, related_name="profile", on_delete=models.CASCADE)
     avatar = models.ImageField(upload_to="avatar", blank=True)
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.CharField(max_length=200, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+OTP_CODE_KEY_PREFIX = "otp:code"
+OTP_ATTEMPTS_KEY_PREFIX = "otp:attempts"
+
+
+def _timeout():
+    return getattr(settings, "TOKEN_EXPIRE_MINUTES", 3) * 60
+
+
+def store_code(phone_number, code):
+    """
+    Keeps code as the only valid one for phone_number until
+    TOKEN_EXPIRE_MINUTES pass and resets the failed attempts
+    """
+    cache.set(f"{OTP_CODE_KEY_PREFIX}:{phone_number}", code, timeout=_timeout())
+    cache.delete(f"{OTP_ATTEMPTS_KEY_PREFIX}:{phone_number}")
+
+
+def verify_code(phone_number, code):
+    """
+    Returns True and consumes the code if it matches the stored one.
+
+    Every call counts as an attempt, the code is discarded once
+    OTP_MAX_ATTEMPTS calls were made so it cannot be guessed.
+    """
+    code_key = f"{OTP_CODE_KEY_PREFIX}:{phone_number}"
+    attempts_key = f"{OTP_ATTEMPTS_KEY_PREFIX}:{phone_number}"
+
+    cache.add(attempts_key, 0, timeout=_timeout())
+    try:
+        attempts = cache.incr(attempts_key)
+    except ValueError:
+        # The attempts expired with the code
+        return False
+
+    stored = cache.get(code_key)
+    if stored is None:
+        return False
+
+    if attempts > getattr(settings, "OTP_MAX_ATTEMPTS", 5):
+        cache.delete(code_key)
+        return False
+
+    if not constant_time_compare(stored, code or ""):
+        return False
+
+    cache.delete_many([code_key, attempts_key])
+    return True
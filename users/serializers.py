@@ -7,6 +7,8 @@ from django.utils.translation import gettext as _
 from rest_framework.validators import UniqueValidator
 from phonenumber_field.serializerfields import PhoneNumberField
 
+from eccomerce_api.images import variant_urls
+
 from .models import (
     PhoneNumber, 
     Profile,
@@ -70,16 +72,31 @@ class UserRegistrationSerializer(RegisterSerializer):
             "last_name": self.validated_data.get("last_name", ""),
         }
         
+    def get_cleaned_data(self):
+        """
+        Adds the names, so allauth sets them before the user is first saved
+        """
+        data = super().get_cleaned_data()
+        data["first_name"] = self.validated_data.get("first_name", "")
+        data["last_name"] = self.validated_data.get("last_name", "")
+        return data
+        
     def create_extra(self, user, validated_data):
-        user.first_name = validated_data.get("first_name")
-        user.last_name = validated_data.get("last_name")
-        user.save()
+        changed = [
+            field
+            for field in ("first_name", "last_name")
+            if getattr(user, field) != validated_data.get(field)
+        ]
+        for field in changed:
+            setattr(user, field, validated_data.get(field))
+        
+        if changed:
+            user.save(update_fields=changed)
         
         phone_number = validated_data.get("phone_number")
         
         if phone_number:
             PhoneNumber.objects.create(user=user, phone_number=phone_number)
-            user.save()
             
     def custom_signup(self, request, user):
         self.create_extra(user, self.get_cleaned_data_extra())
@@ -122,12 +139,11 @@ class UserLoginSerializer(serializers.Serializer):
             raise AccountDisabledException()
         
         if email:
-            email_address = user.emailaddress_set.filter(email=user.email, verified=True).exists()
-            if not email_address:
+            if not user.email_verified:
                 raise serializers.ValidationError(_("Email address is not verified."))
             
         else:
-            if not user.phone.is_verified:
+            if not user.phone_number.is_verified:
                 raise serializers.ValidationError(_("Phone number is not verified."))
             
         attrs["user"] = user
@@ -147,14 +163,13 @@ class PhoneNumberSerializer(serializers.ModelSerializer):
         fields = ["phone_number"]
         
     def validate_phone_number(self, value):
-        try:
-            queryset = User.objects.get(phone__phone_number=value) 
-            if queryset.phone.is_verified:
-                raise serializers.ValidationError(_("Phone number is already verified."))
-            
-        except User.DoesNotExist:
+        phone = PhoneNumber.objects.filter(phone_number=value).only("is_verified").first()
+        if phone is None:
             raise AccountNotRegisteredException()
-        
+
+        if phone.is_verified:
+            raise serializers.ValidationError(_("Phone number is already verified."))
+
         return value
     
 
@@ -167,19 +182,15 @@ class VerifyPhoneNumberSerializer(serializers.Serializer):
     phone_number = PhoneNumberField()
     verification_code = serializers.CharField(max_length=settings.TOKEN_LENGTH)
     
-    def validate_phone_number(self, value):
-        queryset = User.objects.filter(phone__phone_number=value)
-        if not queryset.exists():
-            raise AccountNotRegisteredException()
-        return value
-    
     def validate(self, attrs):
         phone_number = str(attrs.get("phone_number"))
-        verification_code = attrs.get("otp")
+        verification_code = attrs.get("verification_code")
         
-        queryset = PhoneNumber.objects.get(phone__phone_number=phone_number)
+        phone = PhoneNumber.objects.filter(phone_number=phone_number).first()
+        if phone is None:
+            raise AccountNotRegisteredException()
         
-        queryset.check_verification(security_code=verification_code)
+        phone.check_verification(security_code=verification_code)
         return attrs
     
 
@@ -189,14 +200,21 @@ class ProfileSerializer(serializers.ModelSerializer):
     Serializer class to serialize the user Profile model
     """
 
+    avatar_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Profile
         fields = (
             "avatar",
+            "avatar_variants",
             "bio",
             "created_at",
             "updated_at",
-        ) 
+        )
+
+    def get_avatar_variants(self, obj):
+        storage = Profile._meta.get_field("avatar").storage
+        return variant_urls(obj.avatar_variants, storage, self.context.get("request"))
         
         
 class AddressReadOnlySerializer(CountryField, serializers.ModelSerializer):
@@ -217,7 +235,7 @@ class UserSerializer(serializers.ModelSerializer):
     """
 
     profile = ProfileSerializer(read_only=True)
-    phone_number = PhoneNumberField(source="phone", read_only=True)
+    phone_number = PhoneNumberField(source="phone_number.phone_number", read_only=True)
     addresses = AddressReadOnlySerializer(read_only=True, many=True)
 
     class Meta:
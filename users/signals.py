@@ -1,8 +1,13 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth import get_user_model
 
-from .models import Profile
+from eccomerce_api.images import schedule_image_variants
+
+from .caching import invalidate_cached_user, invalidate_user_detail
+from .models import Address, PhoneNumber, Profile
+from .tasks import generate_avatar_variants
 
 User = get_user_model()
 
@@ -16,9 +21,51 @@ def create_profile(sender, instance, created, **kwargs):
         
         
 @receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
+def save_profile(sender, instance, created, **kwargs):
+    """
+    Saves the profile loaded on the user, which only writes if it changed.
+
+    A profile that was never loaded cannot have changed, so plain user saves
+    such as the last_login update of every login do not touch it.
+    """
+    if not created and sender.profile.is_cached(instance):
+        instance.profile.save()
+
+
+@receiver(post_save, sender=Profile)
+def schedule_avatar_variants(sender, instance, **kwargs):
+    """
+    Builds the resized avatars in the background after an upload
+    """
+    schedule_image_variants(instance, "avatar", "avatar_variants", generate_avatar_variants)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_cached_user(sender, instance, **kwargs):
+    """
+    Drops the authentication snapshot of the user, again after commit so a
+    request running meanwhile cannot cache the old row back
+    """
+    user_id = instance.pk
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_user_detail_cache(sender, instance, **kwargs):
+    invalidate_user_detail(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=Address)
+@receiver(post_delete, sender=Address)
+@receiver(post_save, sender=PhoneNumber)
+@receiver(post_delete, sender=PhoneNumber)
+def clear_owner_detail_cache(sender, instance, **kwargs):
     """
-    Saves the profile for the user
+    The user details embed the profile, addresses and phone number
     """
-    instance.profile.save()
-    
\ No newline at end of file
+    invalidate_user_detail(instance.user_id)
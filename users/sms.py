@@ -0,0 +1,86 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from twilio.base.exceptions import TwilioRestException
+from twilio.rest import Client
+
+SMS_RATE_KEY_PREFIX = "sms:rate"
+
+# Messages sent by LocMemSMSProvider, for load tests without a real provider
+outbox = []
+
+
+class SMSDeliveryError(Exception):
+    """
+    The provider could not accept the message, sending it again may succeed
+    """
+
+
+class BaseSMSProvider:
+    """
+    Sends text messages, one instance is reused by every task of a worker
+    """
+
+    def send(self, to, body):
+        raise NotImplementedError
+
+
+class TwilioSMSProvider(BaseSMSProvider):
+    """
+    Sends through Twilio, does nothing when it is not configured
+    """
+
+    def __init__(self):
+        account_sid = getattr(settings, "TWILIO_ACCOUNT_SID", None)
+        auth_token = getattr(settings, "TWILIO_AUTH_TOKEN", None)
+        self.from_ = getattr(settings, "TWILIO_PHONE_NUMBER", None)
+
+        self.client = None
+        if all([account_sid, auth_token, self.from_]):
+            self.client = Client(account_sid, auth_token)
+
+    def send(self, to, body):
+        if self.client is None:
+            return
+
+        try:
+            self.client.messages.create(body=body, to=to, from_=self.from_)
+        except TwilioRestException as e:
+            raise SMSDeliveryError(str(e)) from e
+
+
+class LocMemSMSProvider(BaseSMSProvider):
+    """
+    Keeps messages in users.sms.outbox instead of sending them
+    """
+
+    def send(self, to, body):
+        outbox.append({"to": to, "body": body})
+
+
+@lru_cache(maxsize=None)
+def get_sms_provider():
+    provider = getattr(settings, "SMS_PROVIDER", "users.sms.TwilioSMSProvider")
+    return import_string(provider)()
+
+
+def allow_sms(phone_number):
+    """
+    Counts a message to phone_number and returns False once SMS_RATE_LIMIT
+    messages were sent to it within SMS_RATE_LIMIT_PERIOD seconds
+    """
+    limit = getattr(settings, "SMS_RATE_LIMIT", 3)
+    period = getattr(settings, "SMS_RATE_LIMIT_PERIOD", 60 * 10)
+    key = f"{SMS_RATE_KEY_PREFIX}:{phone_number}"
+
+    cache.add(key, 0, timeout=period)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # The window expired between add and incr
+        cache.set(key, 1, timeout=period)
+        count = 1
+
+    return count <= limit
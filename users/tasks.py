@@ -0,0 +1,32 @@
+from celery import shared_task
+
+from eccomerce_api.images import build_image_variants
+from users.caching import invalidate_user_detail
+from users.models import Profile
+from users.sms import SMSDeliveryError, get_sms_provider
+
+
+@shared_task
+def generate_avatar_variants(profile_id):
+    profile = Profile.objects.filter(pk=profile_id).first()
+    if profile is None or not profile.avatar:
+        return
+
+    variants = build_image_variants(profile.avatar)
+
+    # Skip the write if the avatar was replaced while the variants were built
+    updated = Profile.objects.filter(pk=profile_id, avatar=profile.avatar.name).update(
+        avatar_variants=variants
+    )
+    if updated:
+        invalidate_user_detail(profile.user_id)
+
+
+@shared_task(
+    autoretry_for=(SMSDeliveryError,),
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=3,
+)
+def send_sms_task(phone_number, body):
+    get_sms_provider().send(phone_number, body)
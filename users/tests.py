@@ -1,3 +1,198 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from eccomerce_api.testing import create_user, use_locmem_cache
+from users.backends.credentials_backend import CredentialsAuthBackend
+from users.models import PhoneNumber, Profile
+
+User = get_user_model()
+
+
+@use_locmem_cache
+class CachedAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = create_user("buyer")
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def get_orders(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/user/orders/")
+
+        user_reads = [
+            query["sql"] for query in queries.captured_queries if 'FROM "auth_user"' in query["sql"]
+        ]
+        return response, user_reads
+
+    def test_second_request_does_not_query_the_user(self):
+        response, user_reads = self.get_orders()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_reads), 1)
+
+        response, user_reads = self.get_orders()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_reads, [])
+
+    def test_deactivated_user_is_rejected_on_the_next_request(self):
+        self.assertEqual(self.get_orders()[0].status_code, 200)
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertEqual(self.get_orders()[0].status_code, 401)
+
+
+def writes(queries, table):
+    return [
+        query["sql"]
+        for query in queries.captured_queries
+        if query["sql"].split(" ", 1)[0] in ("INSERT", "UPDATE", "DELETE")
+        and f'"{table}"' in query["sql"].split("SET", 1)[0]
+    ]
+
+
+@use_locmem_cache
+class UserWriteTests(APITestCase):
+    password = "Str0ng-passw0rd"
+
+    def test_login_only_updates_last_login(self):
+        user = create_user("buyer", password=self.password)
+        EmailAddress.objects.create(user=user, email=user.email, verified=True, primary=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/user/login/",
+                {"email": user.email, "password": self.password},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        user_writes = writes(queries, "auth_user")
+        self.assertEqual(len(user_writes), 1)
+        self.assertIn('SET "last_login"', user_writes[0])
+        self.assertFalse(any('"users_profile"' in q["sql"] for q in queries.captured_queries))
+
+    def test_registration_inserts_the_user_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/user/register/",
+                {
+                    "email": "new@example.com",
+                    "first_name": "New",
+                    "last_name": "Buyer",
+                    "password1": self.password,
+                    "password2": self.password,
+                },
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 201, response.content)
+        user_writes = writes(queries, "auth_user")
+        self.assertEqual(len(user_writes), 1)
+        self.assertTrue(user_writes[0].startswith("INSERT"))
+        self.assertEqual(len(writes(queries, "users_profile")), 1)
+
+        user = User.objects.get(email="new@example.com")
+        self.assertEqual((user.first_name, user.last_name), ("New", "Buyer"))
+
+    def test_unchanged_profile_save_issues_no_query(self):
+        user = create_user("buyer")
+        profile = Profile.objects.get(user=user)
+
+        with self.assertNumQueries(0):
+            profile.save()
+
+        profile.bio = "Hello"
+        with CaptureQueriesContext(connection) as queries:
+            profile.save()
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('SET "bio"', queries[0]["sql"])
+        self.assertNotIn('"avatar"', queries[0]["sql"])
+
+
+@use_locmem_cache
+class CredentialsBackendTests(APITestCase):
+    password = "Str0ng-passw0rd"
+    phone_number = "+923001234567"
+
+    def setUp(self):
+        self.backend = CredentialsAuthBackend()
+        self.user = create_user("buyer", password=self.password)
+
+    def verify(self, email=True, phone=True):
+        EmailAddress.objects.create(
+            user=self.user, email=self.user.email, verified=email, primary=True
+        )
+        PhoneNumber.objects.create(
+            user=self.user, phone_number=self.phone_number, is_verified=phone
+        )
+
+    def authenticate(self, username, password=None):
+        with CaptureQueriesContext(connection) as queries:
+            user = self.backend.authenticate(
+                None, username=username, password=password or self.password
+            )
+            # The login checks read these, they must come with the user
+            if user is not None:
+                user.email_verified, user.phone_number.is_verified
+
+        return user, len(queries)
+
+    def login(self, **credentials):
+        return self.client.post(
+            "/api/user/login/", {"password": self.password, **credentials}, format="json"
+        )
+
+    def test_email_login_takes_one_query(self):
+        self.verify()
+        user, queries = self.authenticate(self.user.email)
+
+        self.assertEqual(user, self.user)
+        self.assertTrue(user.email_verified)
+        self.assertEqual(queries, 1)
+
+    def test_phone_login_takes_one_query(self):
+        self.verify()
+        user, queries = self.authenticate(self.phone_number)
+
+        self.assertEqual(user, self.user)
+        self.assertTrue(user.phone_number.is_verified)
+        self.assertEqual(queries, 1)
+
+    def test_unverified_email_is_rejected(self):
+        self.verify(email=False)
+        response = self.login(email=self.user.email)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Email address is not verified.", str(response.content))
+
+    def test_unverified_phone_is_rejected(self):
+        self.verify(phone=False)
+        response = self.login(phone_number=self.phone_number)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Phone number is not verified.", str(response.content))
+
+    def test_unknown_account_still_hashes_the_password(self):
+        with mock.patch(
+            "django.contrib.auth.base_user.make_password", wraps=make_password
+        ) as hash_password:
+            user, queries = self.authenticate("nobody@example.com")
+
+        self.assertIsNone(user)
+        self.assertEqual(queries, 1)
+        hash_password.assert_called_once_with(self.password)
+
+    def test_other_identifiers_are_not_looked_up(self):
+        for username in ("buyer", "12", "+92 300", "not a number"):
+            with self.subTest(username=username):
+                self.assertEqual(self.authenticate(username), (None, 0))
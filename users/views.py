@@ -13,6 +13,7 @@ from rest_framework.generics import (
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from users.caching import get_cached_user_detail, set_cached_user_detail
 from users.models import Address, PhoneNumber, Profile
 from users.permissions import IsUserAddressOwner, IsUserProfileOwner
 from .serializers import (
@@ -43,10 +44,8 @@ class SendOrResendSMSAPIView(GenericAPIView):
             # Send OTP
             phone_number = str(serializer.validated_data["phone_number"])
 
-            user = User.objects.filter(phone__phone_number=phone_number).first()
-
             sms_verification = PhoneNumber.objects.filter(
-                user=user, is_verified=False
+                phone_number=phone_number, is_verified=False
             ).first()
 
             sms_verification.send_confirmation()
@@ -152,12 +151,26 @@ class UserAPIView(RetrieveAPIView):
     Get user details
     """
 
-    queryset = User.objects.all()
+    queryset = User.objects.select_related("profile", "phone_number").prefetch_related(
+        "addresses__user"
+    )
     serializer_class = UserSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        return self.get_queryset().get(pk=self.request.user.pk)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve the cached details of the current user
+        """
+        data = get_cached_user_detail(request.user.pk)
+
+        if data is None:
+            data = self.get_serializer(self.get_object()).data
+            set_cached_user_detail(request.user.pk, data)
+
+        return Response(data)
     
     
 